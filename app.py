@@ -9,12 +9,11 @@ sys.path.append(os.getcwd())
 from src.models.concretos import Osciloscopio, Multimetro, MotorInduccion
 from src.logical.estrategias import DesgasteLineal, DesgasteExponencial
 # --- NUEVOS IMPORTS ---
-from src.repositories.equipo_repository import EquipoRepository
-from src.utils.mapper import map_json_to_object
+from src.services.sync_service import SyncService
+from src.services.snapshot_service import SnapshotFlota
 
-# 3. Imports de las Vistas (Frontend POO)
-from src.views.inspeccion import VistaInspeccion
-from src.views.dashboard import VistaDashboard
+# 3. Las Vistas (Frontend POO) se importan en main(), solo la del perfil elegido:
+#    un estudiante que escanea un QR no carga pandas, OpenCV ni el dashboard
 
 st.set_page_config(page_title="FIEE Maintenance OOP", page_icon="🏭", layout="wide")
 
@@ -24,20 +23,19 @@ if 'db_laboratorios' not in st.session_state:
     st.session_state.est_lineal = DesgasteLineal()
     st.session_state.est_expo = DesgasteExponencial()
     
-    # B. CARGA DE DATOS DESDE SUPABASE (Reemplaza al diccionario manual)
-    repo = EquipoRepository()
-    datos_crudos = repo.leer_todos()
+    # B. CARGA DE DATOS: desde el snapshot local si existe (se reconcilia con Supabase al final
+    #    del primer render); si no, paginada desde Supabase, dejando el snapshot escrito
+    datos_agrupados, st.session_state.estado_sync = SyncService(snapshot=SnapshotFlota()).carga_inicial(
+        st.session_state.est_lineal,
+        st.session_state.est_expo
+    )
     
-    if datos_crudos:
-        st.session_state.db_laboratorios = map_json_to_object(
-            datos_crudos, 
-            st.session_state.est_lineal, 
-            st.session_state.est_expo
-        )
+    if datos_agrupados:
+        st.session_state.db_laboratorios = datos_agrupados
         print("✅ Datos cargados de Supabase")
     else:
         st.warning("⚠️ Base de datos vacía o desconectada. Iniciando vacío.")
-        st.session_state.db_laboratorios = {}
+        st.session_state.db_laboratorios = datos_agrupados # Registro vacío
 
 # --- CONTROLLER (Main) ---
 def main():
@@ -51,12 +49,38 @@ def main():
     vista_actual = None
 
     if opcion == "Estudiante / Técnico":
+        from src.views.inspeccion import VistaInspeccion
         vista_actual = VistaInspeccion()
     else:
+        from src.views.dashboard import VistaDashboard
         vista_actual = VistaDashboard()
 
     if vista_actual:
         vista_actual.render()
 
+    reconciliar_snapshot()
+
+def reconciliar_snapshot():
+    """
+    Si la flota salió del snapshot local, la página ya se dibujó con esos datos:
+    recién ahora se aplican los cambios que la base tuvo mientras tanto.
+    """
+    if not SyncService.reconciliacion_pendiente(st.session_state.get('estado_sync')):
+        return
+    sync = SyncService(snapshot=SnapshotFlota())
+    registro = st.session_state.db_laboratorios
+    version = registro.version
+    nuevo_estado = sync.aplicar_reconciliacion(
+        registro, st.session_state.estado_sync, st.session_state.est_lineal, st.session_state.est_expo
+    )
+    if nuevo_estado is None:
+        # Hueco (filas borradas o error de red): carga completa, que además renueva el snapshot
+        st.session_state.db_laboratorios, nuevo_estado = sync.carga_completa(
+            st.session_state.est_lineal, st.session_state.est_expo
+        )
+    st.session_state.estado_sync = nuevo_estado
+    if st.session_state.db_laboratorios is not registro or registro.version != version:
+        st.rerun()
+
 if __name__ == "__main__":
     main()                                                                                                     
\ No newline at end of file
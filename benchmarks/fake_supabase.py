@@ -0,0 +1,212 @@
+import copy
+import operator
+from bisect import bisect_left, bisect_right
+
+from src.interfaces.backend import huella_id
+
+
+class _Respuesta:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class _Consulta:
+    """
+    Lo mínimo del query builder de supabase-py (PostgREST) que usa SupabaseBackend:
+    select / insert / upsert / update, filtros eq / gt / gte / in_, order, limit, range
+    (y rpc en el cliente).
+    Las filas se devuelven copiadas, como si hubieran viajado por la red.
+    """
+
+    def __init__(self, cliente, tabla):
+        self._cliente = cliente
+        self._tabla = tabla
+        self._operacion = "select"
+        self._columnas = None
+        self._filas = None
+        self._filtros = []
+        self._orden = []
+        self._desde, self._hasta = 0, None
+        self._contar = False
+        self._solo_conteo = False
+        self._on_conflict = None
+        self._ignorar_duplicados = False
+
+    # --- Operaciones ---
+    def select(self, columnas="*", count=None, head=False):
+        self._columnas = None if columnas == "*" else columnas.split(",")
+        self._contar = count == "exact"
+        self._solo_conteo = head
+        return self
+
+    def insert(self, filas):
+        self._operacion, self._filas = "insert", filas
+        return self
+
+    def upsert(self, filas, on_conflict=None, ignore_duplicates=False):
+        self._operacion, self._filas, self._on_conflict = "upsert", filas, on_conflict
+        self._ignorar_duplicados = ignore_duplicates
+        return self
+
+    def update(self, datos):
+        self._operacion, self._filas = "update", datos
+        return self
+
+    # --- Filtros y orden ---
+    def eq(self, columna, valor):
+        self._filtros.append((columna, operator.eq, valor))
+        return self
+
+    def gt(self, columna, valor):
+        self._filtros.append((columna, operator.gt, valor))
+        return self
+
+    def gte(self, columna, valor):
+        self._filtros.append((columna, operator.ge, valor))
+        return self
+
+    def in_(self, columna, valores):
+        conjunto = set(valores)
+        self._filtros.append((columna, lambda v, c: v in c, conjunto))
+        return self
+
+    def order(self, columna, desc=False):
+        self._orden.append((columna, desc))
+        return self
+
+    def limit(self, n):
+        self._hasta = self._desde + n - 1
+        return self
+
+    def range(self, desde, hasta):
+        self._desde, self._hasta = desde, hasta
+        return self
+
+    # --- Ejecución ---
+    def _coincide(self, fila):
+        return all(fila.get(col) is not None and op(fila.get(col), val) for col, op, val in self._filtros)
+
+    def execute(self):
+        self._cliente.llamadas += 1
+        filas = self._cliente.tablas.setdefault(self._tabla, [])
+        if self._operacion != "select":
+            self._cliente.modificada(self._tabla)
+
+        if self._operacion in ("insert", "upsert"):
+            nuevas = copy.deepcopy(self._filas)
+            if self._operacion == "upsert" and self._on_conflict:
+                clave = self._on_conflict
+                existentes = {f[clave]: i for i, f in enumerate(filas) if f.get(clave) is not None}
+                insertadas = []
+                for fila in nuevas:
+                    # Como en Postgres, NULL nunca choca con otra fila
+                    if fila.get(clave) in existentes:
+                        if not self._ignorar_duplicados:
+                            filas[existentes[fila[clave]]].update(fila)
+                        continue
+                    fila.setdefault("id", self._cliente.siguiente_id(self._tabla))
+                    if fila.get(clave) is not None:
+                        existentes[fila[clave]] = len(filas)
+                    filas.append(fila)
+                    insertadas.append(fila)
+                if self._ignorar_duplicados:
+                    nuevas = insertadas
+            else:
+                for fila in nuevas:
+                    if "id" not in fila:
+                        fila["id"] = self._cliente.siguiente_id(self._tabla)
+                filas.extend(nuevas)
+            return _Respuesta(copy.deepcopy(nuevas))
+
+        if self._operacion == "update":
+            for fila in filas:
+                if self._coincide(fila):
+                    fila.update(copy.deepcopy(self._filas))
+            return _Respuesta([])
+
+        if self._contar:
+            total = sum(1 for f in filas if self._coincide(f))
+            if self._solo_conteo:
+                return _Respuesta([], total)
+        else:
+            total = None
+
+        # Como un índice de Postgres: filas ya ordenadas y, si el primer orden es ascendente
+        # y hay un filtro gt/gte sobre esa columna, se empieza a recorrer desde el corte
+        ordenadas, claves = self._cliente.ordenadas(self._tabla, tuple(self._orden))
+        inicio = 0
+        if self._orden and not self._orden[0][1]:
+            for columna, op, valor in self._filtros:
+                if columna == self._orden[0][0] and op in (operator.gt, operator.ge):
+                    corte = bisect_right if op is operator.gt else bisect_left
+                    inicio = max(inicio, corte(claves, (False, valor)))
+
+        necesarias = None if self._hasta is None else self._hasta + 1
+        resultado = []
+        for fila in ordenadas[inicio:] if inicio else ordenadas:
+            if self._coincide(fila):
+                resultado.append(fila)
+                if necesarias is not None and len(resultado) >= necesarias:
+                    break
+        resultado = resultado[self._desde:]
+        if self._columnas is not None:
+            resultado = [{c: f.get(c) for c in self._columnas} for f in resultado]
+        return _Respuesta(copy.deepcopy(resultado), total)
+
+
+class _Rpc:
+    def __init__(self, cliente, calcular):
+        self._cliente = cliente
+        self._calcular = calcular
+
+    def execute(self):
+        self._cliente.llamadas += 1
+        return _Respuesta(self._calcular())
+
+
+class FakeSupabaseClient:
+    """
+    Cliente de Supabase en memoria para benchmarks: se usa con el backend real
+    (SupabaseBackend(FakeSupabaseClient(...))), así se mide el mismo código que en
+    producción pero sin red. 'llamadas' cuenta los requests que se habrían hecho.
+    """
+
+    def __init__(self, tablas=None):
+        self.tablas = {nombre: [dict(fila) for fila in filas] for nombre, filas in (tablas or {}).items()}
+        self.llamadas = 0
+        self._ids = {}
+        self._ordenes = {}
+        # Como en Postgres, cada fila tiene su 'id' autoincremental
+        for nombre, filas in self.tablas.items():
+            for fila in filas:
+                fila.setdefault("id", self.siguiente_id(nombre))
+
+    def table(self, nombre):
+        return _Consulta(self, nombre)
+
+    def rpc(self, funcion, params=None):
+        """Funciones de migraciones.sql que usa SupabaseBackend (solo resumen_equipos)."""
+        if funcion != "resumen_equipos":
+            raise ValueError(f"Función desconocida: {funcion}")
+        return _Rpc(self, lambda: [{
+            "filas": len(self.tablas.get("equipos", [])),
+            "huella": str(sum(huella_id(f["id_activo"]) for f in self.tablas.get("equipos", []))),
+        }])
+
+    def modificada(self, tabla):
+        self._ordenes = {clave: v for clave, v in self._ordenes.items() if clave[0] != tabla}
+
+    def ordenadas(self, tabla, orden):
+        """(filas ordenadas por 'orden', claves de la primera columna), cacheado hasta la próxima escritura."""
+        if (tabla, orden) not in self._ordenes:
+            filas = list(self.tablas.get(tabla, []))
+            for columna, desc in reversed(orden):
+                filas.sort(key=lambda f: (f.get(columna) is None, f.get(columna)), reverse=desc)
+            claves = [(f.get(orden[0][0]) is None, f.get(orden[0][0])) for f in filas] if orden else []
+            self._ordenes[(tabla, orden)] = (filas, claves)
+        return self._ordenes[(tabla, orden)]
+
+    def siguiente_id(self, tabla):
+        self._ids[tabla] = self._ids.get(tabla, 0) + 1
+        return self._ids[tabla]
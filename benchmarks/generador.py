@@ -0,0 +1,101 @@
+import random
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from src.interfaces.backend import COLUMNAS_INCIDENCIAS, COLUMNAS_LECTURA
+from src.models.incidencia import severidad_de
+
+# Proporciones aproximadas del inventario real de la facultad
+LABORATORIOS = {
+    "Laboratorio de Control": 0.30,
+    "Laboratorio de Circuitos": 0.35,
+    "Laboratorio de Máquinas": 0.20,
+    "Laboratorio FIEE": 0.15,
+}
+TIPOS = {"Multimetro": 0.45, "Osciloscopio": 0.35, "MotorInduccion": 0.20}
+ESTADOS = {
+    "OPERATIVO": 0.86, "REPORTADO_CON_FALLA": 0.04, "EN_MANTENIMIENTO": 0.05,
+    "FALLA": 0.02, "BAJA": 0.03,
+}
+MODELOS = {
+    "Multimetro": ["Fluke 87V", "Fluke 117", "UNI-T UT61E", "Keysight U1242C"],
+    "Osciloscopio": ["Tektronix TBS1052", "Keysight EDUX1002A", "Rigol DS1054Z", "Siglent SDS1202X-E"],
+    "MotorInduccion": ["Siemens 1LE1", "WEG W22", "ABB M2BAX", "Baldor EM3615T"],
+}
+DETALLES_INCIDENCIA = [
+    "Ruido en rodamientos", "Pantalla con líneas", "Punta de prueba dañada", "No enciende",
+    "Lectura inestable", "Sobrecalentamiento", "Olor a QUEMADO en la fuente", "Fusible cambiado",
+]
+DICTAMENES = [None, None, "IA: ✅ Sin daños visibles.", "IA: ⚠️ Posible desgaste térmico.",
+              "IA: 🔥 ALERTA: zona CARBONIZADA detectada."]
+
+
+def _elegir(azar, pesos):
+    return azar.choices(list(pesos), weights=list(pesos.values()))[0]
+
+
+def _largo_historial(azar):
+    """La mayoría de los equipos no tiene tickets; unos pocos acumulan muchos (cola larga)."""
+    if azar.random() < 0.55:
+        return 0
+    return min(int(azar.expovariate(1 / 3)) + 1, 60)
+
+
+def generar_flota(n, semilla=42):
+    """
+    Flota sintética reproducible: devuelve (filas_equipos, filas_incidencias) con
+    exactamente las columnas de las tablas 'equipos' (COLUMNAS_LECTURA, con el
+    resumen de incidencias ya calculado) e 'incidencias' (COLUMNAS_INCIDENCIAS).
+    """
+    azar = random.Random(semilla)
+    hoy = date(2026, 1, 1)
+    marca_base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    equipos, incidencias = [], []
+
+    for i in range(n):
+        tipo = _elegir(azar, TIPOS)
+        id_activo = f"{tipo[:3].upper()}-{i:06d}"
+        fecha_compra = hoy - timedelta(days=azar.randint(30, 15 * 365))
+
+        if tipo == "MotorInduccion":
+            detalles = {"hp": f"{azar.choice([1, 2, 5, 10, 15])}HP",
+                        "voltaje": azar.choice(["220V", "380V", "440V"]),
+                        "rpm": azar.choice([1800, 3600])}
+        elif tipo == "Osciloscopio":
+            detalles = {"ancho_banda": f"{azar.choice([50, 70, 100, 200])}MHz"}
+        else:
+            detalles = {"precision": azar.choice(["0.05%", "0.1%", "0.5%"])}
+
+        tickets = []
+        for k in range(_largo_historial(azar)):
+            fecha = fecha_compra + timedelta(days=azar.randint(0, max((hoy - fecha_compra).days, 1)))
+            ticket = {"fecha": fecha.isoformat(), "detalle": azar.choice(DETALLES_INCIDENCIA)}
+            dictamen = azar.choice(DICTAMENES)
+            if dictamen is not None:
+                ticket["dictamen_ia"] = dictamen
+            tickets.append(ticket)
+        tickets.sort(key=lambda t: t["fecha"])
+
+        for ticket in tickets:
+            fila = {"uuid": str(uuid.UUID(int=azar.getrandbits(128), version=4)),
+                    "id_activo": id_activo, "fecha": ticket["fecha"], "detalle": ticket["detalle"],
+                    "dictamen_ia": ticket.get("dictamen_ia"), "severidad": severidad_de(ticket), "datos": {}}
+            incidencias.append({columna: fila[columna] for columna in COLUMNAS_INCIDENCIAS})
+
+        fila = {
+            "id_activo": id_activo,
+            "modelo": azar.choice(MODELOS[tipo]),
+            "tipo_equipo": tipo,
+            "fecha_compra": fecha_compra.isoformat(),
+            "ubicacion": _elegir(azar, LABORATORIOS),
+            "estado": _elegir(azar, ESTADOS),
+            "estrategia_nombre": "DesgasteExponencial" if tipo == "MotorInduccion" else "DesgasteLineal",
+            "detalles_tecnicos": detalles,
+            "actualizado_en": (marca_base + timedelta(seconds=i)).isoformat(),
+            "ultima_severidad": severidad_de(tickets[-1]) if tickets else None,
+            "total_incidencias": len(tickets),
+            "ultima_incidencia_en": tickets[-1]["fecha"] if tickets else None,
+        }
+        equipos.append({columna: fila[columna] for columna in COLUMNAS_LECTURA})
+
+    return equipos, incidencias
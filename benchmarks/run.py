@@ -0,0 +1,196 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from statistics import median
+
+sys.path.append(os.getcwd())
+
+import cv2
+import numpy as np
+
+from benchmarks.fake_supabase import FakeSupabaseClient
+from benchmarks.generador import generar_flota
+from src.database.supabase_backend import SupabaseBackend
+from src.equipo_factory import EquipoFactory
+from src.logical.estrategias import DesgasteLineal, DesgasteExponencial
+from src.logical.obsolescencia import calcular_obsolescencia_flota
+from src.models.flota import RegistroFlota
+from src.repositories.equipo_repository import EquipoRepository
+from src.services.predictive_service import PredictiveService
+from src.services.report_service import generar_pdf
+from src.services.sync_service import SyncService
+from src.services.vision_service import VisionService
+from src.utils.mapper import map_json_to_object
+from src.views.dashboard import convertir_objetos_a_df
+
+TAMANOS = (1_000, 10_000, 100_000)
+SEMILLA = 42
+# Las operaciones de a un equipo (gráfico, PDF, foto) se miden sobre una muestra fija
+MUESTRA = 200
+FOTOS = 20
+# Por encima de este tamaño se mide una sola vez (cada repetición tarda demasiado)
+TAMANO_SIN_REPETIR = 50_000
+# Un caso es regresión si tarda más que esto respecto del archivo de referencia
+TOLERANCIA_REGRESION = 1.20
+
+
+def medir(funcion, repeticiones):
+    """Segundos de cada repetición (con el recolector de basura apagado mientras se mide)."""
+    tiempos = []
+    for _ in range(repeticiones):
+        preparado = funcion.preparar() if hasattr(funcion, "preparar") else None
+        gc.collect()
+        gc.disable()
+        try:
+            inicio = time.perf_counter()
+            funcion(preparado)
+            tiempos.append(time.perf_counter() - inicio)
+        finally:
+            gc.enable()
+    return tiempos
+
+
+class Caso:
+    """Un benchmark: 'preparar' (sin medir) arma la entrada de cada repetición; 'medir' la usa."""
+
+    def __init__(self, nombre, medir, elementos, preparar=None):
+        self.nombre = nombre
+        self._medir = medir
+        self.elementos = elementos
+        if preparar is not None:
+            self.preparar = preparar
+
+    def __call__(self, preparado):
+        self._medir(preparado)
+
+
+def fotos_sinteticas(cantidad, semilla=SEMILLA):
+    """Fotos JPEG de 1600x1200 (ruido con una zona oscura de tamaño variable), en bytes."""
+    azar = np.random.default_rng(semilla)
+    fotos = []
+    for _ in range(cantidad):
+        imagen = azar.integers(60, 230, size=(1200, 1600), dtype=np.uint8)
+        lado = int(azar.integers(50, 900))
+        imagen[:lado, :lado] = azar.integers(0, 40, size=(lado, lado), dtype=np.uint8)
+        fotos.append(cv2.imencode(".jpg", imagen)[1].tobytes())
+    return fotos
+
+
+def casos_para(n, semilla=SEMILLA):
+    lineal, exponencial = DesgasteLineal(), DesgasteExponencial()
+    filas, incidencias = generar_flota(n, semilla)
+    cliente = FakeSupabaseClient({"equipos": filas, "incidencias": incidencias})
+    sync = SyncService(EquipoRepository(SupabaseBackend(cliente)))
+
+    equipos = map_json_to_object(filas, lineal, exponencial, sync.cargador)
+    registro = RegistroFlota()
+    for equipo in equipos:
+        registro.agregar(equipo)
+    muestra = equipos[:min(MUESTRA, n)]
+    sync.precargar_historiales(muestra)
+    fotos = fotos_sinteticas(FOTOS)
+    vision = VisionService(usar_cache=False)
+    predictor = PredictiveService()
+
+    def sin_memo():
+        for equipo in equipos:
+            equipo._cache_obsolescencia = None
+
+    return [
+        Caso("carga_completa (fake Supabase)", lambda _: sync.carga_completa(lineal, exponencial), n),
+        Caso("map_json_to_object", lambda _: map_json_to_object(filas, lineal, exponencial, sync.cargador), n),
+        Caso("EquipoFactory.crear_equipo",
+             lambda _: [EquipoFactory.crear_equipo(f["tipo_equipo"], f, f["detalles_tecnicos"], lineal) for f in filas], n),
+        Caso("calcular_obsolescencia (uno por uno)",
+             lambda _: [equipo.calcular_obsolescencia() for equipo in equipos], n, preparar=sin_memo),
+        Caso("calcular_obsolescencia_flota", lambda _: calcular_obsolescencia_flota(equipos), n),
+        Caso("convertir_objetos_a_df", lambda _: convertir_objetos_a_df(registro), n),
+        Caso("predecir_flota", lambda _: predictor.predecir_flota(equipos), n),
+        Caso("generar_prediccion", lambda _: [predictor.generar_prediccion(equipo) for equipo in muestra], len(muestra)),
+        Caso("generar_pdf", lambda _: [generar_pdf(equipo, equipo.ubicacion) for equipo in muestra], len(muestra)),
+        Caso("analizar_quemadura", lambda _: [vision.analizar_quemadura(foto) for foto in fotos], len(fotos)),
+    ]
+
+
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar(tamanos, repeticiones, semilla=SEMILLA):
+    resultados = []
+    for n in tamanos:
+        print(f"\n=== FLOTA DE {n:,} EQUIPOS ===")
+        for caso in casos_para(n, semilla):
+            tiempos = medir(caso, 1 if n > TAMANO_SIN_REPETIR else repeticiones)
+            resultado = {
+                "caso": caso.nombre,
+                "equipos": n,
+                "elementos": caso.elementos,
+                "repeticiones": len(tiempos),
+                "segundos_min": min(tiempos),
+                "segundos_mediana": median(tiempos),
+                "us_por_elemento": min(tiempos) / caso.elementos * 1e6,
+            }
+            resultados.append(resultado)
+            print(f"{caso.nombre:<38} | {resultado['segundos_min'] * 1000:>10.1f} ms "
+                  f"| {resultado['us_por_elemento']:>10.1f} µs/elem ({caso.elementos:,})")
+    return {
+        "commit": commit_actual(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "nucleos": os.cpu_count(),
+        "semilla": semilla,
+        "resultados": resultados,
+    }
+
+
+def comparar(actual, referencia):
+    """Imprime la razón actual/referencia de cada caso. Devuelve la lista de regresiones."""
+    previos = {(r["caso"], r["equipos"]): r for r in referencia["resultados"]}
+    regresiones = []
+    print(f"\n=== COMPARACIÓN CONTRA {referencia.get('commit')} ===")
+    for r in actual["resultados"]:
+        previo = previos.get((r["caso"], r["equipos"]))
+        if previo is None:
+            continue
+        razon = r["us_por_elemento"] / previo["us_por_elemento"]
+        marca = "❌" if razon > TOLERANCIA_REGRESION else "✅"
+        print(f"{marca} {r['caso']:<38} | {r['equipos']:>7,} | x{razon:.2f}")
+        if razon > TOLERANCIA_REGRESION:
+            regresiones.append(r)
+    return regresiones
+
+
+if __name__ == "__main__":
+    # Uso: python -m benchmarks.run [--tamanos 1000 10000 100000] [--salida archivo.json] [--comparar referencia.json]
+    parser = argparse.ArgumentParser(description="Benchmarks de las rutas calientes con una flota sintética")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=list(TAMANOS))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--salida", help="JSON de resultados (por defecto benchmarks/resultados/<commit>.json)")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para detectar regresiones")
+    args = parser.parse_args()
+
+    informe = ejecutar(args.tamanos, args.repeticiones, args.semilla)
+
+    salida = args.salida or os.path.join("benchmarks", "resultados", f"{informe['commit'] or 'sin_commit'}.json")
+    os.makedirs(os.path.dirname(salida) or ".", exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Resultados guardados en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regresiones = comparar(informe, json.load(f))
+        sys.exit(1 if regresiones else 0)
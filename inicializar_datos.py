@@ -32,10 +32,10 @@ def cargar_ejemplos():
 
     lista_equipos = [m1, o1, mu1, o2, m2]
 
-    # --- GUARDADO EN BUCLE ---
-    for equipo in lista_equipos:
-        # Usamos el repositorio para guardar (esto mandará los datos a Supabase con la ubicación correcta)
-        repo.guardar_equipo(equipo)
+    # --- GUARDADO MASIVO (un solo request por lote en vez de uno por equipo) ---
+    resultado = repo.guardar_equipos(lista_equipos)
+    for id_activo, error in resultado["errores"].items():
+        print(f"❌ {id_activo}: {error}")
     print("✅ ¡Datos de ejemplo cargados! Ahora ve a tu Dashboard.")
 if __name__ == "__main__":
     cargar_ejemplos()
\ No newline at end of file
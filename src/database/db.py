@@ -1,20 +1,110 @@
 import os
-from supabase import create_client
+import threading
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Parámetros del pool HTTP (se pueden ajustar desde el .env)
+POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "10"))
+TIMEOUT_SEGUNDOS = float(os.getenv("SUPABASE_TIMEOUT", "120"))
+KEEPALIVE_SEGUNDOS = float(os.getenv("SUPABASE_KEEPALIVE", "60"))
+
+# Backend de persistencia: "supabase" (nube) o "sqlite" (archivo local)
+BACKEND = os.getenv("FIEE_BACKEND", "supabase").strip().lower()
+SQLITE_RUTA = os.getenv("FIEE_SQLITE_PATH", "fiee_local.db")
+
 class DatabaseConnection:
+    """
+    Registro de clientes a nivel de proceso.
+    Todas las instancias de EquipoRepository (y todas las sesiones de Streamlit,
+    que corren en hilos distintos) comparten el mismo backend: el mismo cliente
+    de Supabase con su pool de conexiones HTTP keep-alive, o la misma base SQLite.
+    """
     _instance = None
+    _http_client = None
+    _backend = None
+    _lock = threading.Lock()
 
     def __new__(cls):
+        cliente = cls.obtener_cliente()
+        if cliente is None: raise ValueError("Falta .env")
+        return cliente
+
+    @classmethod
+    def obtener_cliente(cls):
+        """Devuelve el cliente compartido, o None si no hay claves en el .env."""
         if cls._instance is None:
-            url = os.getenv("SUPABASE_URL")
-            key = os.getenv("SUPABASE_KEY")
-            if not url: raise ValueError("Falta .env")
-            cls._instance = create_client(url, key)
-            print("✅ Conexión Singleton establecida") # Esto te avisará que funcionó
-        return cls._instance
-
-# ESTA LÍNEA ES CLAVE: Crea el objeto "db" que usará todo el equipo
-db = DatabaseConnection()
\ No newline at end of file
+            with cls._lock:
+                # Doble verificación: otro hilo pudo crearlo mientras esperábamos
+                if cls._instance is None:
+                    cls._instance = cls._crear_cliente()
+        return cls._instance or None
+
+    @classmethod
+    def obtener_backend(cls):
+        """
+        Backend compartido según la configuración (FIEE_BACKEND).
+        Devuelve None si se eligió Supabase y no hay claves.
+        """
+        if cls._backend is None:
+            if BACKEND == "sqlite":
+                from src.database.sqlite_backend import SQLiteBackend
+                with cls._lock:
+                    if cls._backend is None:
+                        cls._backend = SQLiteBackend(SQLITE_RUTA)
+                        print(f"✅ Usando base local SQLite: {SQLITE_RUTA}")
+            else:
+                from src.database.supabase_backend import SupabaseBackend
+                cliente = cls.obtener_cliente()
+                with cls._lock:
+                    if cls._backend is None:
+                        cls._backend = SupabaseBackend(cliente) if cliente else False
+        return cls._backend or None
+
+    @classmethod
+    def _crear_cliente(cls):
+        url = os.getenv("SUPABASE_URL")
+        key = os.getenv("SUPABASE_KEY")
+        if not url or not key:
+            print("⚠️ ADVERTENCIA: No se encontraron las claves en .env (usa FIEE_BACKEND=sqlite para trabajar sin conexión)")
+            return False # Recordamos que no hay claves para no reintentar en cada clic
+
+        # Se importan recién aquí: con SQLite (o sin claves) nunca se cargan
+        import httpx
+        from supabase import create_client, ClientOptions
+
+        cls._http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=POOL_SIZE,
+                max_keepalive_connections=POOL_SIZE,
+                keepalive_expiry=KEEPALIVE_SEGUNDOS,
+            ),
+            timeout=httpx.Timeout(TIMEOUT_SEGUNDOS),
+            follow_redirects=True,
+            http2=True,
+        )
+        cliente = create_client(url, key, options=ClientOptions(httpx_client=cls._http_client))
+        # Inicializamos el cliente REST aquí, dentro del lock, para que los hilos no compitan
+        cliente.postgrest
+        print("✅ Conexión Singleton establecida") # Esto te avisará que funcionó
+        return cliente
+
+    @classmethod
+    def cerrar(cls):
+        """Cierra el pool de conexiones y el backend (al apagar el servidor o en pruebas)."""
+        with cls._lock:
+            if cls._http_client is not None:
+                cls._http_client.close()
+            if cls._backend and hasattr(cls._backend, "cerrar"):
+                cls._backend.cerrar()
+            cls._instance = None
+            cls._http_client = None
+            cls._backend = None
+
+
+def __getattr__(nombre):
+    # "db" se crea recién cuando alguien lo usa, no al importar el módulo
+    if nombre == "db":
+        return DatabaseConnection()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
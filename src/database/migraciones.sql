@@ -0,0 +1,97 @@
+-- ==============================================================================
+-- Migraciones de la tabla "equipos" en Supabase (ejecutar en el SQL Editor)
+-- ==============================================================================
+
+-- 1. Marca de modificación para la sincronización incremental (SyncService)
+ALTER TABLE equipos
+    ADD COLUMN IF NOT EXISTS actualizado_en timestamptz NOT NULL DEFAULT clock_timestamp();
+
+-- clock_timestamp() y no now(): now() es el inicio de la transacción, y un lote largo
+-- quedaría con una marca muy anterior a su commit. Igual una marca puede hacerse visible
+-- después de otra mayor (el commit llega más tarde): SyncService relee siempre una
+-- ventana de solape antes de su última marca.
+CREATE OR REPLACE FUNCTION marcar_actualizado_en() RETURNS trigger AS $$
+BEGIN
+    NEW.actualizado_en = clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_equipos_actualizado_en ON equipos;
+CREATE TRIGGER trg_equipos_actualizado_en
+    BEFORE INSERT OR UPDATE ON equipos
+    FOR EACH ROW EXECUTE FUNCTION marcar_actualizado_en();
+
+CREATE INDEX IF NOT EXISTS idx_equipos_actualizado_en ON equipos (actualizado_en, id_activo);
+
+-- Detección de huecos: cantidad de filas y suma de las huellas de los id_activo
+-- (60 bits del md5, igual que huella_id() en src/interfaces/backend.py).
+-- Un borrado seguido de un alta deja la misma cantidad pero cambia la suma.
+CREATE OR REPLACE FUNCTION resumen_equipos()
+RETURNS TABLE (filas bigint, huella text) AS $$
+    SELECT count(*),
+           coalesce(sum(('x' || substr(md5(id_activo), 1, 15))::bit(60)::bigint), 0)::text
+      FROM equipos;
+$$ LANGUAGE sql STABLE;
+
+-- 2. Registro append-only de incidencias (un ticket por fila, nunca se reescribe)
+CREATE TABLE IF NOT EXISTS incidencias (
+    id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    uuid uuid UNIQUE,
+    id_activo text NOT NULL REFERENCES equipos (id_activo) ON DELETE CASCADE,
+    fecha text,
+    detalle text,
+    dictamen_ia text,
+    severidad text NOT NULL DEFAULT 'NORMAL',
+    datos jsonb NOT NULL DEFAULT '{}'::jsonb,
+    creado_en timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_incidencias_equipo ON incidencias (id_activo, id);
+
+-- Identificador que genera la app al crear el ticket: la app inserta con
+-- ON CONFLICT (uuid) DO NOTHING, así reintentar tras un timeout no duplica el ticket
+-- (y como no hay INSERT, el trigger del resumen no lo vuelve a contar).
+-- Los tickets viejos quedan con NULL, que no choca con nada.
+ALTER TABLE incidencias ADD COLUMN IF NOT EXISTS uuid uuid UNIQUE;
+
+-- Resumen en la fila del equipo (lo mantiene el trigger, la app nunca lo envía)
+ALTER TABLE equipos
+    ADD COLUMN IF NOT EXISTS ultima_severidad text,
+    ADD COLUMN IF NOT EXISTS total_incidencias integer NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS ultima_incidencia_en timestamptz;
+
+-- El incremento se hace en la base: dos inspectores reportando a la vez no se pisan.
+-- Al tocar la fila del equipo también se actualiza actualizado_en (trigger del punto 1),
+-- así la sincronización incremental se entera del nuevo ticket.
+CREATE OR REPLACE FUNCTION resumir_incidencia() RETURNS trigger AS $$
+BEGIN
+    UPDATE equipos
+       SET total_incidencias = total_incidencias + 1,
+           ultima_severidad = NEW.severidad,
+           ultima_incidencia_en = NEW.creado_en
+     WHERE id_activo = NEW.id_activo;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_incidencias_resumen ON incidencias;
+CREATE TRIGGER trg_incidencias_resumen
+    AFTER INSERT ON incidencias
+    FOR EACH ROW EXECUTE FUNCTION resumir_incidencia();
+
+-- Pasamos los historiales existentes (solo equipos que todavía no tienen tickets migrados)
+INSERT INTO incidencias (id_activo, fecha, detalle, dictamen_ia, severidad, datos)
+SELECT e.id_activo, h.ticket->>'fecha', h.ticket->>'detalle', h.ticket->>'dictamen_ia',
+       CASE WHEN upper(coalesce(h.ticket->>'dictamen_ia', '') || coalesce(h.ticket->>'detalle', ''))
+                 ~ '(ALERTA|CARBONIZADA|CRITICO|QUEMADO)' THEN 'CRITICA' ELSE 'NORMAL' END,
+       h.ticket - 'fecha' - 'detalle' - 'dictamen_ia'
+  FROM equipos e
+ CROSS JOIN LATERAL jsonb_array_elements(coalesce(e.historial_incidencias, '[]'::jsonb))
+       WITH ORDINALITY AS h(ticket, n)
+ WHERE NOT EXISTS (SELECT 1 FROM incidencias i WHERE i.id_activo = e.id_activo)
+ ORDER BY e.id_activo, h.n;
+
+-- La app ya no escribe la columna vieja; se puede borrar cuando todos los clientes estén actualizados:
+-- ALTER TABLE equipos DROP COLUMN historial_incidencias;
+ALTER TABLE equipos ALTER COLUMN historial_incidencias SET DEFAULT '[]'::jsonb;
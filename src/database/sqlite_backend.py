@@ -0,0 +1,229 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from src.interfaces.backend import IBackendEquipos, COLUMNAS_EQUIPOS, COLUMNAS_LECTURA, COLUMNAS_INCIDENCIAS, huella_id
+from src.models.incidencia import severidad_de
+
+# Columnas que se guardan como texto JSON
+COLUMNAS_JSON = ("detalles_tecnicos", "datos")
+
+SELECCION_EQUIPOS = ", ".join(COLUMNAS_LECTURA)
+SELECCION_INCIDENCIAS = ", ".join(("id",) + COLUMNAS_INCIDENCIAS + ("creado_en",))
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS equipos (
+    id_activo TEXT PRIMARY KEY,
+    modelo TEXT,
+    tipo_equipo TEXT,
+    fecha_compra TEXT,
+    ubicacion TEXT,
+    estado TEXT NOT NULL DEFAULT 'OPERATIVO',
+    estrategia_nombre TEXT,
+    detalles_tecnicos TEXT NOT NULL DEFAULT '{}',
+    actualizado_en TEXT NOT NULL,
+    ultima_severidad TEXT,
+    total_incidencias INTEGER NOT NULL DEFAULT 0,
+    ultima_incidencia_en TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_equipos_ubicacion ON equipos (ubicacion);
+CREATE INDEX IF NOT EXISTS idx_equipos_tipo ON equipos (tipo_equipo);
+CREATE INDEX IF NOT EXISTS idx_equipos_estado ON equipos (estado);
+CREATE INDEX IF NOT EXISTS idx_equipos_actualizado_en ON equipos (actualizado_en, id_activo);
+
+CREATE TABLE IF NOT EXISTS incidencias (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    uuid TEXT UNIQUE,
+    id_activo TEXT NOT NULL REFERENCES equipos (id_activo) ON DELETE CASCADE,
+    fecha TEXT,
+    detalle TEXT,
+    dictamen_ia TEXT,
+    severidad TEXT NOT NULL DEFAULT 'NORMAL',
+    datos TEXT NOT NULL DEFAULT '{}',
+    creado_en TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_incidencias_equipo ON incidencias (id_activo, id);
+"""
+
+class SQLiteBackend(IBackendEquipos):
+    """
+    Backend local en un archivo SQLite (laboratorios sin conexión o pruebas).
+    id_activo es la clave primaria, así que ya tiene su índice único.
+    Una sola conexión compartida y protegida con un lock: la usan los hilos de
+    Streamlit y el hilo de la cola write-behind.
+    """
+
+    def __init__(self, ruta="fiee_local.db"):
+        self.ruta = ruta
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            if ruta != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(ESQUEMA)
+            self._migrar()
+
+    def _migrar(self):
+        """Archivos creados con la versión anterior: historial como JSON dentro de 'equipos'."""
+        columnas_incidencias = {fila["name"] for fila in self._conn.execute("PRAGMA table_info(incidencias)")}
+        if "uuid" not in columnas_incidencias:
+            # ADD COLUMN no admite UNIQUE: la unicidad la da el índice
+            with self._conn:
+                self._conn.execute("ALTER TABLE incidencias ADD COLUMN uuid TEXT")
+                self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_incidencias_uuid ON incidencias (uuid)")
+
+        columnas = {fila["name"] for fila in self._conn.execute("PRAGMA table_info(equipos)")}
+        if "total_incidencias" in columnas:
+            return
+        with self._conn:
+            for columna, tipo in (("ultima_severidad", "TEXT"),
+                                  ("total_incidencias", "INTEGER NOT NULL DEFAULT 0"),
+                                  ("ultima_incidencia_en", "TEXT")):
+                self._conn.execute(f"ALTER TABLE equipos ADD COLUMN {columna} {tipo}")
+        if "historial_incidencias" not in columnas:
+            return
+        filas = []
+        for fila in self._conn.execute("SELECT id_activo, historial_incidencias FROM equipos"):
+            for ticket in json.loads(fila["historial_incidencias"] or "[]"):
+                datos = {k: v for k, v in ticket.items() if k not in ("fecha", "detalle", "dictamen_ia")}
+                filas.append({"id_activo": fila["id_activo"], "fecha": ticket.get("fecha"),
+                              "detalle": ticket.get("detalle"), "dictamen_ia": ticket.get("dictamen_ia"),
+                              "severidad": severidad_de(ticket), "datos": datos})
+        self.insertar_incidencias(filas)
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    def insertar(self, filas):
+        self._escribir(filas, "")
+
+    def upsert(self, filas):
+        asignaciones = ", ".join(f"{c} = excluded.{c}" for c in COLUMNAS_EQUIPOS if c != "id_activo")
+        self._escribir(filas, f" ON CONFLICT(id_activo) DO UPDATE SET {asignaciones}")
+
+    def actualizar(self, id_activo, datos):
+        self.actualizar_varios([id_activo], datos)
+
+    def actualizar_varios(self, ids, datos):
+        datos = dict(datos, actualizado_en=_ahora())
+        columnas = [c for c in datos if c in COLUMNAS_EQUIPOS and c != "id_activo"]
+        asignaciones = ", ".join(f"{c} = ?" for c in columnas)
+        valores = [_a_sqlite(c, datos[c]) for c in columnas]
+        with self._lock, self._conn:
+            self._conn.executemany(f"UPDATE equipos SET {asignaciones} WHERE id_activo = ?",
+                                   [(*valores, id_activo) for id_activo in ids])
+
+    def _escribir(self, filas, sufijo):
+        marca = _ahora()
+        columnas = ", ".join(COLUMNAS_EQUIPOS)
+        marcadores = ", ".join("?" for _ in COLUMNAS_EQUIPOS)
+        valores = [
+            tuple(_a_sqlite(c, marca if c == "actualizado_en" else fila.get(c)) for c in COLUMNAS_EQUIPOS)
+            for fila in filas
+        ]
+        # "with self._conn" abre una transacción: si una fila falla, no se guarda ninguna
+        with self._lock, self._conn:
+            self._conn.executemany(f"INSERT INTO equipos ({columnas}) VALUES ({marcadores}){sufijo}", valores)
+
+    def insertar_incidencias(self, filas):
+        marca = _ahora()
+        columnas = ", ".join(COLUMNAS_INCIDENCIAS)
+        marcadores = ", ".join("?" for _ in COLUMNAS_INCIDENCIAS)
+        sql = f"INSERT OR IGNORE INTO incidencias ({columnas}, creado_en) VALUES ({marcadores}, ?)"
+        # Ticket y resumen en la misma transacción: el contador se incrementa en la base,
+        # así dos inspectores reportando a la vez no se pisan. Un uuid repetido (reintento)
+        # no inserta nada y tampoco se cuenta
+        with self._lock, self._conn:
+            insertadas = [fila for fila in filas
+                          if self._conn.execute(sql, tuple(_a_sqlite(c, fila.get(c)) for c in COLUMNAS_INCIDENCIAS)
+                                                + (marca,)).rowcount]
+            self._conn.executemany(
+                "UPDATE equipos SET total_incidencias = total_incidencias + 1, ultima_severidad = ?, "
+                "ultima_incidencia_en = ?, actualizado_en = ? WHERE id_activo = ?",
+                [(fila.get("severidad"), marca, marca, fila["id_activo"]) for fila in insertadas])
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+    def leer_todos(self, columnas=COLUMNAS_LECTURA):
+        return self._consultar(f"SELECT {_seleccion(columnas)} FROM equipos")
+
+    def leer_pagina(self, despues_de_id, limite, columnas=COLUMNAS_LECTURA):
+        if despues_de_id is None:
+            return self._consultar(f"SELECT {_seleccion(columnas)} FROM equipos ORDER BY id_activo LIMIT ?", (limite,))
+        return self._consultar(
+            f"SELECT {_seleccion(columnas)} FROM equipos WHERE id_activo > ? ORDER BY id_activo LIMIT ?",
+            (despues_de_id, limite))
+
+    def leer_cambios(self, marca, despues_de, limite):
+        if despues_de is None:
+            return self._consultar(
+                f"SELECT {SELECCION_EQUIPOS} FROM equipos WHERE actualizado_en >= ? "
+                "ORDER BY actualizado_en, id_activo LIMIT ?",
+                (marca, limite))
+        return self._consultar(
+            f"SELECT {SELECCION_EQUIPOS} FROM equipos "
+            "WHERE actualizado_en >= ? AND (actualizado_en, id_activo) > (?, ?) "
+            "ORDER BY actualizado_en, id_activo LIMIT ?",
+            (marca, *despues_de, limite))
+
+    def leer_incidencias(self, id_activo, inicio, limite):
+        return self._consultar(
+            f"SELECT {SELECCION_INCIDENCIAS} FROM incidencias WHERE id_activo = ? ORDER BY id LIMIT ? OFFSET ?",
+            (id_activo, limite, inicio))
+
+    def leer_incidencias_de(self, ids, inicio, limite):
+        ids = list(ids)
+        marcadores = ", ".join("?" for _ in ids)
+        return self._consultar(
+            f"SELECT {SELECCION_INCIDENCIAS} FROM incidencias WHERE id_activo IN ({marcadores}) "
+            "ORDER BY id LIMIT ? OFFSET ?",
+            (*ids, limite, inicio))
+
+    def contar(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM equipos").fetchone()[0]
+
+    def resumen(self):
+        with self._lock:
+            ids = [fila[0] for fila in self._conn.execute("SELECT id_activo FROM equipos")]
+        return {"filas": len(ids), "huella": sum(map(huella_id, ids))}
+
+    def _consultar(self, sql, parametros=()):
+        with self._lock:
+            filas = self._conn.execute(sql, parametros).fetchall()
+        return [_de_sqlite(fila) for fila in filas]
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _seleccion(columnas):
+    # Los nombres van dentro del SQL: solo aceptamos columnas conocidas
+    desconocidas = set(columnas) - set(COLUMNAS_LECTURA)
+    if desconocidas:
+        raise ValueError(f"Columnas desconocidas: {sorted(desconocidas)}")
+    return ", ".join(columnas)
+
+def _ahora():
+    # Mismo formato ISO que devuelve Supabase, para comparar marcas como texto
+    # (formato fijo: isoformat() omite los microsegundos cuando valen 0)
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+
+def _a_sqlite(columna, valor):
+    if columna in COLUMNAS_JSON:
+        return json.dumps(valor if valor is not None else {}, ensure_ascii=False)
+    if columna == "estado" and valor is None:
+        return "OPERATIVO"
+    return valor
+
+def _de_sqlite(fila):
+    datos = dict(fila)
+    for columna in COLUMNAS_JSON:
+        if datos.get(columna) is not None:
+            datos[columna] = json.loads(datos[columna])
+    return datos
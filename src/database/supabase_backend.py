@@ -0,0 +1,94 @@
+from src.interfaces.backend import IBackendEquipos, COLUMNAS_LECTURA, COLUMNAS_INCIDENCIAS
+
+# Columnas que se descargan: la vieja columna historial_incidencias ya no viaja
+SELECCION_EQUIPOS = ",".join(COLUMNAS_LECTURA)
+SELECCION_INCIDENCIAS = ",".join(("id",) + COLUMNAS_INCIDENCIAS + ("creado_en",))
+
+class SupabaseBackend(IBackendEquipos):
+    """
+    Backend remoto: tablas "equipos" e "incidencias" en Supabase (PostgREST).
+    El resumen de incidencias de cada equipo lo mantiene un trigger
+    (ver src/database/migraciones.sql).
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def _tabla(self):
+        return self.client.table("equipos")
+
+    def insertar(self, filas):
+        self._tabla().insert(filas).execute()
+
+    def upsert(self, filas):
+        self._tabla().upsert(filas, on_conflict="id_activo").execute()
+
+    def actualizar(self, id_activo, datos):
+        self._tabla().update(datos).eq("id_activo", id_activo).execute()
+
+    def actualizar_varios(self, ids, datos):
+        # Un solo request: PATCH ... ?id_activo=in.(...)
+        self._tabla().update(datos).in_("id_activo", list(ids)).execute()
+
+    def leer_todos(self, columnas=COLUMNAS_LECTURA):
+        return self._tabla().select(",".join(columnas)).execute().data
+
+    def leer_pagina(self, despues_de_id, limite, columnas=COLUMNAS_LECTURA):
+        consulta = self._tabla().select(",".join(columnas)).order("id_activo").limit(limite)
+        if despues_de_id is not None:
+            consulta = consulta.gt("id_activo", despues_de_id)
+        return consulta.execute().data
+
+    def leer_cambios(self, marca, despues_de, limite):
+        if despues_de is None:
+            return (self._tabla().select(SELECCION_EQUIPOS)
+                    .gte("actualizado_en", marca)
+                    .order("actualizado_en").order("id_activo")
+                    .limit(limite)
+                    .execute().data)
+        # Keyset sobre (actualizado_en, id_activo) con filtros simples: primero las filas
+        # que empatan con la última marca leída y después las de marcas mayores
+        ultima_marca, ultimo_id = despues_de
+        filas = (self._tabla().select(SELECCION_EQUIPOS)
+                 .eq("actualizado_en", ultima_marca).gt("id_activo", ultimo_id)
+                 .order("id_activo")
+                 .limit(limite)
+                 .execute().data)
+        if len(filas) < limite:
+            filas += (self._tabla().select(SELECCION_EQUIPOS)
+                      .gt("actualizado_en", ultima_marca)
+                      .order("actualizado_en").order("id_activo")
+                      .limit(limite - len(filas))
+                      .execute().data)
+        return filas
+
+    def contar(self):
+        return self._tabla().select("id_activo", count="exact", head=True).execute().count
+
+    def resumen(self):
+        try:
+            fila = self.client.rpc("resumen_equipos").execute().data[0]
+        except Exception as e:
+            # Base sin la función de migraciones.sql: solo se puede comparar la cantidad
+            print(f"⚠️ resumen_equipos() no disponible ({e}); se compara solo la cantidad de filas")
+            return {"filas": self.contar(), "huella": None}
+        return {"filas": int(fila["filas"]), "huella": int(fila["huella"])}
+
+    def insertar_incidencias(self, filas):
+        # INSERT ... ON CONFLICT (uuid) DO NOTHING: un reintento tras un timeout no duplica
+        # el ticket, y el trigger del resumen solo corre para las filas insertadas
+        self.client.table("incidencias").upsert(filas, on_conflict="uuid", ignore_duplicates=True).execute()
+
+    def leer_incidencias(self, id_activo, inicio, limite):
+        return (self.client.table("incidencias").select(SELECCION_INCIDENCIAS)
+                .eq("id_activo", id_activo)
+                .order("id")
+                .range(inicio, inicio + limite - 1)
+                .execute().data)
+
+    def leer_incidencias_de(self, ids, inicio, limite):
+        return (self.client.table("incidencias").select(SELECCION_INCIDENCIAS)
+                .in_("id_activo", list(ids))
+                .order("id")
+                .range(inicio, inicio + limite - 1)
+                .execute().data)
@@ -1,4 +1,5 @@
 from src.models.concretos import MotorInduccion, Osciloscopio, Multimetro
+from src.utils.metricas import medir
 
 class EquipoFactory:
     """
@@ -30,6 +31,7 @@ class EquipoFactory:
         cls._constructores[nombre] = funcion_constructora
 
     @classmethod
+    @medir("factory.crear_equipo")
     def crear_equipo(cls, tipo, item, detalles, estrategia):
         """
         Busca el constructor en el diccionario y ejecuta la creación instantáneamente.
@@ -0,0 +1,24 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+class IAnalizadorImagen(ABC):
+    """
+    Interfaz para los chequeos del motor de visión (VisionService).
+    Cada analizador deriva su métrica del histograma de grises de la foto
+    (256 casillas), así agregar un chequeo no agrega otra pasada por los píxeles.
+    """
+    nombre = ""
+    # Subir la versión al cambiar la lógica de evaluar(): invalida los resultados guardados
+    version = 1
+    # False: solo advierte sobre la calidad de la foto, no sobre el equipo
+    afecta_estado = True
+
+    @abstractmethod
+    def evaluar(self, histograma: np.ndarray) -> dict:
+        """Devuelve {"valor": float, "critico": bool, "mensaje": str}."""
+        pass
+
+    def firma(self) -> tuple:
+        """Identifica al analizador y sus umbrales (parte de la clave de la caché de resultados)."""
+        return (type(self).__name__, self.version, tuple(sorted(vars(self).items())))
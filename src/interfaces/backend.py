@@ -0,0 +1,107 @@
+import hashlib
+from abc import ABC, abstractmethod
+
+# Columnas de la tabla "equipos" que escriben todos los backends
+COLUMNAS_EQUIPOS = (
+    "id_activo", "modelo", "tipo_equipo", "fecha_compra", "ubicacion", "estado",
+    "estrategia_nombre", "detalles_tecnicos", "actualizado_en",
+)
+
+# Resumen de incidencias en la fila del equipo: solo lo actualiza el backend
+# al insertar un ticket (nunca se envía en un upsert, así no se pisa)
+COLUMNAS_RESUMEN = ("ultima_severidad", "total_incidencias", "ultima_incidencia_en")
+
+# Proyección por defecto al leer equipos: sin historial (se carga aparte y a pedido)
+COLUMNAS_LECTURA = COLUMNAS_EQUIPOS + COLUMNAS_RESUMEN
+
+# Tabla "incidencias": registro append-only, un ticket por fila.
+# 'uuid' lo genera la app al crear el ticket (columna UNIQUE): reintentar el insert no lo duplica
+COLUMNAS_INCIDENCIAS = ("uuid", "id_activo", "fecha", "detalle", "dictamen_ia", "severidad", "datos")
+
+def huella_id(id_activo) -> int:
+    """
+    Huella de un id_activo: los primeros 60 bits de su md5. La suma de las huellas
+    de la tabla no depende del orden y se puede llevar al día fila por fila; la
+    función resumen_equipos() de migraciones.sql calcula exactamente lo mismo.
+    """
+    return int(hashlib.md5(id_activo.encode("utf-8")).hexdigest()[:15], 16)
+
+class IBackendEquipos(ABC):
+    """
+    Interfaz para el almacenamiento de la tabla "equipos".
+    EquipoRepository trabaja con filas (diccionarios) y delega aquí la persistencia,
+    así se puede cambiar Supabase por otra base (p. ej. SQLite local) sin tocar las vistas.
+    Los métodos lanzan excepción si la operación falla; el repositorio decide qué hacer.
+    """
+
+    @abstractmethod
+    def insertar(self, filas: list) -> None:
+        """Inserta filas nuevas. Todo el lote falla si alguna fila falla."""
+        pass
+
+    @abstractmethod
+    def upsert(self, filas: list) -> None:
+        """Inserta o reemplaza filas usando id_activo como clave."""
+        pass
+
+    @abstractmethod
+    def actualizar(self, id_activo: str, datos: dict) -> None:
+        pass
+
+    def actualizar_varios(self, ids: list, datos: dict) -> None:
+        """Aplica los mismos valores a varias filas existentes (las que no existen se ignoran)."""
+        for id_activo in ids:
+            self.actualizar(id_activo, datos)
+
+    @abstractmethod
+    def leer_todos(self, columnas=COLUMNAS_LECTURA) -> list:
+        """Todas las filas, solo con las columnas pedidas."""
+        pass
+
+    @abstractmethod
+    def leer_pagina(self, despues_de_id, limite: int, columnas=COLUMNAS_LECTURA) -> list:
+        """Filas ordenadas por id_activo, con id_activo > despues_de_id (None = desde el inicio)."""
+        pass
+
+    @abstractmethod
+    def leer_cambios(self, marca, despues_de, limite: int) -> list:
+        """
+        Filas con actualizado_en >= marca, ordenadas por (actualizado_en, id_activo).
+        'despues_de' es el (actualizado_en, id_activo) de la última fila ya leída
+        (keyset pagination; None = desde el inicio).
+        """
+        pass
+
+    @abstractmethod
+    def contar(self) -> int:
+        pass
+
+    @abstractmethod
+    def resumen(self) -> dict:
+        """
+        {"filas": cantidad, "huella": suma de huella_id de todos los id_activo}.
+        Si la comparación de ids no está disponible, "huella" es None.
+        """
+        pass
+
+    # ------------------------------------------------------------------
+    # Incidencias (append-only)
+    # ------------------------------------------------------------------
+    @abstractmethod
+    def insertar_incidencias(self, filas: list) -> None:
+        """
+        Agrega tickets (nunca reescribe los anteriores) y actualiza el resumen
+        de cada equipo (severidad, cantidad y fecha del último ticket).
+        Un ticket cuyo uuid ya está guardado se ignora (ni se duplica ni se vuelve a contar).
+        """
+        pass
+
+    @abstractmethod
+    def leer_incidencias(self, id_activo: str, inicio: int, limite: int) -> list:
+        """Tickets de un equipo en orden de llegada, desde la posición 'inicio'."""
+        pass
+
+    @abstractmethod
+    def leer_incidencias_de(self, ids: list, inicio: int, limite: int) -> list:
+        """Tickets de varios equipos, ordenados por orden de llegada."""
+        pass
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
 
+import numpy as np
+
 class IEstrategiaDesgaste(ABC):
     """
     Interfaz para el Patrón Strategy.
@@ -7,4 +9,15 @@ class IEstrategiaDesgaste(ABC):
     """
     @abstractmethod
     def calcular(self, fecha_compra: str) -> float:
-        pass
\ No newline at end of file
+        pass
+
+    def calcular_lote(self, fechas_compra) -> np.ndarray:
+        """
+        Versión vectorizada de calcular() para toda la flota.
+        Recibe un arreglo de fechas de compra y devuelve un arreglo de índices.
+        Por defecto aplica calcular() elemento a elemento; las estrategias
+        concretas la sobreescriben con un cálculo en un solo paso.
+        """
+        fechas = np.asarray(fechas_compra)
+        valores = [self.calcular(str(f)) for f in fechas.ravel()]
+        return np.array(valores, dtype=float).reshape(fechas.shape)
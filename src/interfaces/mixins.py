@@ -1,16 +1,22 @@
 import random
 
 class IdentificableQR:
+    __slots__ = () # Sin estado propio: no agrega __dict__ a los equipos
+
     def generar_qr(self) -> str:
         codigo = f"QR-{id(self)}"
         return f"📡 [QR SYSTEM] Identificado activo: {codigo}"
 
 class AnalizadorPredictivo:
+    __slots__ = ()
+
     def predecir_fallo(self) -> str:
         probabilidad = random.randint(15, 85)
         return f"🔮 [IA] Probabilidad de fallo: {probabilidad}% (Vibración anómala detectada)"
 
 class InspectorVisual:
+    __slots__ = ()
+
     def analizar_foto(self, ruta_imagen: str) -> dict:
         # Simulamos procesamiento de imagen
         return {"status": "OK", "detalles": "Lente frontal limpio, sin grietas visibles."}
\ No newline at end of file
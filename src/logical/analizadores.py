@@ -0,0 +1,58 @@
+import numpy as np
+
+from src.interfaces.analizadores import IAnalizadorImagen
+
+
+def media_histograma(histograma: np.ndarray) -> float:
+    """Brillo medio de la imagen, calculado a partir de su histograma."""
+    total = histograma.sum()
+    return float(np.dot(np.arange(histograma.size), histograma) / total) if total else 0.0
+
+
+class AnalizadorQuemadura(IAnalizadorImagen):
+    """Porcentaje de píxeles oscuros: zonas carbonizadas (antes VisionService.analizar_quemadura)"""
+    nombre = "quemadura"
+
+    def __init__(self, umbral_oscuridad=45, porcentaje_critico=25.0):
+        self.umbral_oscuridad = umbral_oscuridad
+        self.porcentaje_critico = porcentaje_critico
+
+    def evaluar(self, histograma):
+        total = histograma.sum()
+        porcentaje = float(histograma[:self.umbral_oscuridad].sum() / total * 100) if total else 0.0
+        if porcentaje > self.porcentaje_critico:
+            return {"valor": porcentaje, "critico": True,
+                    "mensaje": f"Zona CARBONIZADA detectada ({porcentaje:.1f}%)."}
+        return {"valor": porcentaje, "critico": False,
+                "mensaje": f"Superficie limpia ({porcentaje:.1f}% oscuridad)."}
+
+
+class AnalizadorOscuridad(IAnalizadorImagen):
+    """Foto demasiado oscura para evaluarla (antes vision_engine.VisionService.analizar_integridad)"""
+    nombre = "oscuridad"
+    afecta_estado = False
+
+    def __init__(self, media_minima=60):
+        self.media_minima = media_minima
+
+    def evaluar(self, histograma):
+        media = media_histograma(histograma)
+        if media < self.media_minima:
+            return {"valor": media, "critico": True,
+                    "mensaje": "CRÍTICA: Oscuridad excesiva (Baja relación señal/ruido)"}
+        return {"valor": media, "critico": False, "mensaje": "ESTADO ÓPTIMO"}
+
+
+class AnalizadorSaturacion(IAnalizadorImagen):
+    """Foto sobreexpuesta (antes vision_engine.VisionService.analizar_integridad)"""
+    nombre = "saturacion"
+    afecta_estado = False
+
+    def __init__(self, media_maxima=225):
+        self.media_maxima = media_maxima
+
+    def evaluar(self, histograma):
+        media = media_histograma(histograma)
+        if media > self.media_maxima:
+            return {"valor": media, "critico": True, "mensaje": "CRÍTICA: Imagen quemada (Saturación)"}
+        return {"valor": media, "critico": False, "mensaje": "ESTADO ÓPTIMO"}
@@ -1,6 +1,31 @@
 import math
 from datetime import datetime
-from src.interfaces.estrategias import IEstrategiaDesgaste 
+
+import numpy as np
+
+from src.interfaces.estrategias import IEstrategiaDesgaste
+
+
+def _anios_de_uso(fechas_compra) -> np.ndarray:
+    """Convierte un arreglo de fechas ('YYYY-MM-DD' o datetime64) en años de uso (mínimo 1)."""
+    fechas = np.asarray(fechas_compra)
+    if np.issubdtype(fechas.dtype, np.datetime64):
+        anios = fechas.astype("datetime64[Y]").astype(np.int64) + 1970
+    else:
+        # Igual que calcular(): nos quedamos con lo que está antes del primer guion
+        anios = np.char.partition(fechas.astype(str), "-")[..., 0].astype(np.int64)
+    return np.maximum(1, datetime.now().year - anios)
+
+
+def _aplicar_por_anio(t: np.ndarray, formula) -> np.ndarray:
+    """
+    Evalúa la fórmula escalar una sola vez por cada valor distinto de 't'
+    y la reparte al resto del arreglo. Así el resultado es idéntico al de calcular().
+    """
+    valores, inversos = np.unique(t.ravel(), return_inverse=True)
+    tabla = np.array([formula(int(v)) for v in valores], dtype=float)
+    return tabla[inversos].reshape(t.shape)
+
 
 class DesgasteLineal(IEstrategiaDesgaste):
     """Implementación para equipos con desgaste constante anual"""
@@ -8,7 +33,14 @@ class DesgasteLineal(IEstrategiaDesgaste):
         anio_compra = int(fecha_compra.split("-")[0])
         anio_actual = datetime.now().year
         t = max(1, anio_actual - anio_compra)
-        
+
+        return self._indice(t)
+
+    def calcular_lote(self, fechas_compra) -> np.ndarray:
+        return _aplicar_por_anio(_anios_de_uso(fechas_compra), self._indice)
+
+    @staticmethod
+    def _indice(t: int) -> float:
         return round(min(t * 0.05, 1.0), 2)
 
 class DesgasteExponencial(IEstrategiaDesgaste):
@@ -17,6 +49,13 @@ class DesgasteExponencial(IEstrategiaDesgaste):
         anio_compra = int(fecha_compra.split("-")[0])
         anio_actual = datetime.now().year
         t = max(1, anio_actual - anio_compra)
-        
+
+        return self._indice(t)
+
+    def calcular_lote(self, fechas_compra) -> np.ndarray:
+        return _aplicar_por_anio(_anios_de_uso(fechas_compra), self._indice)
+
+    @staticmethod
+    def _indice(t: int) -> float:
         indice = (math.exp(0.2 * t) - 1) / 10
         return round(min(indice, 1.0), 2)
@@ -0,0 +1,38 @@
+import numpy as np
+
+
+def calcular_obsolescencia_flota(equipos) -> np.ndarray:
+    """
+    Evaluador de obsolescencia para toda la flota en un solo paso.
+    Equivale a llamar Equipo.calcular_obsolescencia() activo por activo,
+    pero agrupa por estrategia y aplica las reglas de seguridad como máscaras.
+    """
+    equipos = list(equipos)
+    resultado = np.zeros(len(equipos), dtype=float)
+    if not equipos:
+        return resultado
+
+    # 1. Agrupamos por instancia de estrategia (normalmente la lineal y la exponencial compartidas)
+    grupos = {}
+    sin_estrategia = np.zeros(len(equipos), dtype=bool)
+    for i, eq in enumerate(equipos):
+        estrategia = getattr(eq, 'estrategia_desgaste', None)
+        if estrategia is None:
+            sin_estrategia[i] = True
+        else:
+            grupos.setdefault(id(estrategia), (estrategia, []))[1].append(i)
+
+    # 2. Cálculo matemático inicial (por tiempo), un lote por estrategia
+    for estrategia, indices in grupos.values():
+        fechas = np.array([equipos[i].fecha_compra for i in indices])
+        resultado[indices] = estrategia.calcular_lote(fechas)
+    resultado = np.minimum(resultado, 1.0)
+
+    # 3. Reglas de seguridad como máscaras (mismo orden de prioridad que el cálculo escalar)
+    criticos = np.fromiter((eq.tiene_alerta_critica() for eq in equipos), dtype=bool, count=len(equipos))
+    de_baja = np.fromiter((eq.esta_de_baja() for eq in equipos), dtype=bool, count=len(equipos))
+    resultado[criticos] = 0.98
+    resultado[de_baja] = 1.0
+    resultado[sin_estrategia] = 0.0
+
+    return resultado
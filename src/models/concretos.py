@@ -3,6 +3,8 @@ from src.interfaces.mixins import IdentificableQR, AnalizadorPredictivo
 
 # --- TIPO 1: ELECTRÓNICA DE LABORATORIO ---
 class Osciloscopio(Equipo, IdentificableQR):
+    __slots__ = ("ancho_banda",)
+
     def __init__(self, id_activo, modelo, fecha, ancho_banda, estrategia):
         # Ahora pasamos la 'estrategia' al padre (Equipo)
         super().__init__(id_activo, modelo, fecha, estrategia)
@@ -11,6 +13,8 @@ class Osciloscopio(Equipo, IdentificableQR):
 
 # --- TIPO 2: INSTRUMENTACIÓN PORTÁTIL ---
 class Multimetro(Equipo, IdentificableQR):
+    __slots__ = ("precision", "es_digital")
+
     def __init__(self, id_activo, modelo, fecha, precision, es_digital: bool, estrategia):
         super().__init__(id_activo, modelo, fecha, estrategia)
         self.precision = precision
@@ -18,6 +22,8 @@ class Multimetro(Equipo, IdentificableQR):
 
 # --- TIPO 3: POTENCIA Y CONTROL ---
 class MotorInduccion(Equipo, IdentificableQR, AnalizadorPredictivo):
+    __slots__ = ("hp", "voltaje", "rpm")
+
     def __init__(self, id_activo, modelo, fecha, hp, voltaje, rpm, estrategia):
         super().__init__(id_activo, modelo, fecha, estrategia)
         self.hp = hp
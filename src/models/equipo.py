@@ -1,6 +1,7 @@
-from datetime import datetime
+from datetime import datetime, date
 import sys
 import os
+import uuid
 
 # Agregamos la ruta raíz para evitar errores de importación
 sys.path.append(os.getcwd())
@@ -12,12 +13,23 @@ try:
 except ImportError:
     IEstrategiaDesgaste = object # Fallback para que no rompa si falla el import
 
+from src.models.incidencia import PALABRAS_CRITICAS, SEVERIDAD_CRITICA, HistorialIncidencias, ticket_es_critico
+
 class Equipo:
+    # Sin __dict__ por instancia: con flotas de 200k equipos la diferencia se nota
+    __slots__ = (
+        "_registro", "_cache_obsolescencia", "id_activo", "modelo", "fecha_compra", "ubicacion",
+        "_estado", "_de_baja", "_historial", "_cargador", "_alerta_critica", "_estrategia_desgaste",
+    )
+
     def __init__(self, id_activo: str, modelo: str, fecha_compra: str, estrategia):
         """
         Constructor que implementa el Patrón Strategy.
         :param estrategia: Instancia de DesgasteLineal o DesgasteExponencial
         """
+        self._registro = None # RegistroFlota que indexa este equipo (si lo hay)
+        self._cache_obsolescencia = None # (día del cálculo, valor)
+        self._cargador = None # Lee el historial de la base la primera vez que se consulta
         self.id_activo = id_activo
         self.modelo = modelo
         self.fecha_compra = fecha_compra
@@ -25,13 +37,115 @@ class Equipo:
         self.historial_incidencias = []
         self.estrategia_desgaste = estrategia
 
+    @property
+    def estado(self):
+        return self._estado
+
+    @estado.setter
+    def estado(self, nuevo_estado):
+        """Al cambiar el estado avisamos al registro para que actualice sus índices."""
+        anterior = getattr(self, '_estado', None)
+        self._estado = nuevo_estado
+        estado_str = str(nuevo_estado.value).upper() if hasattr(nuevo_estado, 'value') else str(nuevo_estado).upper()
+        self._de_baja = "BAJA" in estado_str
+        self._cache_obsolescencia = None
+        if self._registro is not None and anterior is not nuevo_estado:
+            self._registro._estado_cambiado(self, anterior)
+
+    @property
+    def historial_incidencias(self):
+        if self._historial is None:
+            self._cargar_historial()
+        return self._historial
+
+    @historial_incidencias.setter
+    def historial_incidencias(self, tickets):
+        self._cargador = None
+        self._historial = HistorialIncidencias(tickets, equipo=self)
+        self._historial_cambiado()
+
+    def _historial_cambiado(self):
+        """Lo llama el historial al registrar un reporte: la bandera se calcula una sola vez aquí."""
+        self._alerta_critica = bool(self._historial) and ticket_es_critico(self._historial[-1])
+        self._desgaste_cambiado()
+
+    def _desgaste_cambiado(self):
+        """Descarta el desgaste memorizado y avisa al registro (que cambia de versión)."""
+        self._cache_obsolescencia = None
+        if self._registro is not None:
+            self._registro._equipo_cambiado(self)
+
+    def diferir_historial(self, cargador, total=0, ultima_severidad=None):
+        """
+        Deja el historial sin descargar: se pide a la base (cargador(id_activo))
+        la primera vez que alguien lo lea. Mientras tanto, la bandera crítica sale
+        del resumen de la fila (severidad del último ticket).
+        """
+        if not total:
+            self.historial_incidencias = []
+            return
+        self._historial = None
+        self._cargador = cargador
+        self._alerta_critica = ultima_severidad == SEVERIDAD_CRITICA
+        self._desgaste_cambiado()
+
+    def historial_cargado(self) -> bool:
+        return self._historial is not None
+
+    def _cargar_historial(self):
+        tickets = self._cargador(self.id_activo) if self._cargador is not None else None
+        if tickets is None:
+            print(f"⚠️ No se pudo leer el historial de {self.id_activo}")
+            tickets = []
+        self.historial_incidencias = tickets
+
+    @property
+    def estrategia_desgaste(self):
+        return self._estrategia_desgaste
+
+    @estrategia_desgaste.setter
+    def estrategia_desgaste(self, estrategia):
+        self._estrategia_desgaste = estrategia
+        self._desgaste_cambiado()
+
+    def __getstate__(self):
+        # El registro no viaja con el equipo (pickle, copias, procesos)
+        slots = {
+            nombre: getattr(self, nombre)
+            for clase in type(self).__mro__ for nombre in getattr(clase, '__slots__', ())
+            if hasattr(self, nombre)
+        }
+        slots['_registro'] = None
+        # Mismo formato que usa pickle para clases con __slots__ (y con __dict__, si una subclase lo tiene)
+        return (getattr(self, '__dict__', None), slots)
+
+    def __setstate__(self, estado):
+        dict_extra, slots = estado
+        if dict_extra:
+            self.__dict__.update(dict_extra)
+        for nombre, valor in slots.items():
+            object.__setattr__(self, nombre, valor)
+        if getattr(self, '_historial', None) is not None:
+            self._historial._equipo = self
+
     def calcular_obsolescencia(self) -> float:
         """
         Calcula el desgaste considerando la estrategia matemática, 
         el historial de la IA y el estado de baja.
+        El resultado queda memorizado hasta que cambie el estado, el historial,
+        la estrategia o el día.
         """
+        hoy = date.today()
+        if self._cache_obsolescencia is not None and self._cache_obsolescencia[0] == hoy:
+            return self._cache_obsolescencia[1]
+
+        valor = self._calcular_obsolescencia_sin_cache()
+        self._cache_obsolescencia = (hoy, valor)
+        return valor
+
+    def _calcular_obsolescencia_sin_cache(self) -> float:
         # 1. Caso base: Sin estrategia
-        if not hasattr(self, 'estrategia_desgaste') or self.estrategia_desgaste is None:
+        if self.estrategia_desgaste is None:
             return 0.0
             
         # 2. Cálculo matemático inicial (por tiempo)
@@ -39,34 +153,41 @@ class Equipo:
         
         # 3. Verificación de Seguridad: Estado de Baja
         # Si el equipo ya está marcado como de baja (por la IA o manual), forzamos el 1.0
-        estado_str = str(self.estado.value).upper() if hasattr(self.estado, 'value') else str(self.estado).upper()
-        if "BAJA" in estado_str:
+        if self.esta_de_baja():
             return 1.0
 
         # 4. Verificación de Seguridad: Historial de IA
-        historial = getattr(self, 'historial_incidencias', [])
-        if historial: 
-            ultimo_ticket = historial[-1]
-            # Revisamos tanto el detalle como el dictamen de la IA
-            texto_analisis = (str(ultimo_ticket.get('dictamen_ia', '')) + 
-                             str(ultimo_ticket.get('detalle', ''))).upper()
-            
-            # Si hay cualquier rastro de daño crítico en el último reporte
-            if any(palabra in texto_analisis for palabra in ["ALERTA", "CARBONIZADA", "CRITICO", "QUEMADO"]):
-                return 0.98 # Lo dejamos casi al tope para que se vea rojo
+        if self.tiene_alerta_critica():
+            return 0.98 # Lo dejamos casi al tope para que se vea rojo
 
         # 5. Si todo está bien, devolvemos el valor teórico sin pasar del 100%
         return min(valor_teorico, 1.0)
 
+    def esta_de_baja(self) -> bool:
+        return self._de_baja
+
+    def tiene_alerta_critica(self) -> bool:
+        """Indica si el último reporte tiene cualquier rastro de daño crítico."""
+        return self._alerta_critica
+
     def cambiar_estrategia(self, nueva_estrategia):
         """
         Permite cambiar la estrategia de cálculo en tiempo de ejecución.
         """
         self.estrategia_desgaste = nueva_estrategia
 
-    def registrar_incidencia(self, descripcion: str):
-        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.historial_incidencias.append({"fecha": fecha, "detalle": descripcion})
+    def registrar_incidencia(self, descripcion: str, dictamen_ia: str = None, fecha: str = None):
+        """
+        Agrega un reporte completo al historial (con el dictamen de la IA, si lo hay)
+        y lo devuelve, para encolarlo en el registro de incidencias de la base.
+        El uuid identifica al ticket en la base: si el insert se reintenta, no se duplica.
+        """
+        fecha = fecha or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ticket = {"uuid": str(uuid.uuid4()), "fecha": fecha, "detalle": descripcion}
+        if dictamen_ia is not None:
+            ticket["dictamen_ia"] = dictamen_ia
+        self.historial_incidencias.append(ticket)
+        return self.historial_incidencias[-1]
 
     def to_dict(self):
         return {
@@ -75,5 +196,5 @@ class Equipo:
             "fecha_compra": self.fecha_compra,
             "estado": self.estado.value,
             "indice_obsolescencia": self.calcular_obsolescencia(),
-            "incidencias": self.historial_incidencias
+            "incidencias": self.historial_incidencias.to_list()
         }
\ No newline at end of file
@@ -0,0 +1,134 @@
+import itertools
+
+from src.utils.enums import EstadoEquipo
+
+# Contador global: dos registros (o dos sesiones) nunca comparten un número de versión
+_VERSIONES = itertools.count(1)
+
+
+class RegistroFlota(dict):
+    """
+    Inventario en memoria: laboratorio -> [equipos], igual que db_laboratorios,
+    más un índice hash id_activo -> (laboratorio, equipo) para búsquedas O(1)
+    e índices secundarios por estado y por tipo de equipo.
+    Las listas se leen normalmente, pero para agregar, mover o quitar equipos hay
+    que usar los métodos del registro, así los índices se mantienen al día.
+    Los cambios de estado (equipo.estado = ...) los avisa el propio equipo.
+    'version' cambia con cada modificación (del registro o de uno de sus equipos):
+    sirve de clave para cachear lo que se calcula a partir de la flota.
+    """
+
+    def __init__(self, laboratorios=None):
+        super().__init__()
+        self.version = next(_VERSIONES)
+        self._por_id = {}
+        # Índices secundarios: clave -> {id_activo: equipo} (dict como conjunto ordenado)
+        self._por_estado = {}
+        self._por_tipo = {}
+        for lab, equipos in (laboratorios or {}).items():
+            self.setdefault(lab, [])
+            for equipo in equipos:
+                self.agregar(equipo, lab)
+
+    def __reduce__(self):
+        # Al copiar o serializar, los índices se reconstruyen a partir de los laboratorios
+        return (RegistroFlota, (dict(self),))
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def buscar(self, id_activo):
+        """Devuelve (laboratorio, equipo), o (None, None) si el id no existe."""
+        return self._por_id.get(id_activo, (None, None))
+
+    def contiene(self, id_activo) -> bool:
+        return id_activo in self._por_id
+
+    def total_equipos(self) -> int:
+        return len(self._por_id)
+
+    def por_laboratorio(self, lab) -> list:
+        return self.get(lab, [])
+
+    def por_estado(self, estado) -> list:
+        return list(self._por_estado.get(estado, {}).values())
+
+    def por_tipo(self, tipo) -> list:
+        """'tipo' es el nombre de la clase concreta, p. ej. "MotorInduccion"."""
+        return list(self._por_tipo.get(tipo, {}).values())
+
+    def no_operativos(self) -> list:
+        """[(laboratorio, equipo)] de todo lo que no está OPERATIVO (zona de recuperación)."""
+        return [
+            (self._por_id[id_activo][0], equipo)
+            for estado, equipos in self._por_estado.items() if estado is not EstadoEquipo.OPERATIVO
+            for id_activo, equipo in equipos.items()
+        ]
+
+    # ------------------------------------------------------------------
+    # Cambios
+    # ------------------------------------------------------------------
+    def agregar(self, equipo, lab=None):
+        """
+        Agrega el equipo o reemplaza al que tenga el mismo id_activo.
+        Si cambió de laboratorio, lo mueve; si no, conserva su posición en la lista.
+        """
+        lab = lab or getattr(equipo, 'ubicacion', 'Laboratorio FIEE')
+        lab_anterior, anterior = self.buscar(equipo.id_activo)
+
+        if anterior is not None:
+            self._desindexar(anterior)
+        if anterior is not None and lab_anterior == lab:
+            lista = self[lab]
+            lista[lista.index(anterior)] = equipo
+        else:
+            if anterior is not None:
+                self[lab_anterior].remove(anterior)
+            self.setdefault(lab, []).append(equipo)
+
+        equipo.ubicacion = lab
+        self._por_id[equipo.id_activo] = (lab, equipo)
+        self._indexar(equipo)
+        self._cambio()
+
+    def mover(self, id_activo, lab_nuevo):
+        lab, equipo = self.buscar(id_activo)
+        if equipo is None:
+            raise KeyError(f"Equipo no registrado: {id_activo}")
+        if lab != lab_nuevo:
+            self.agregar(equipo, lab_nuevo)
+
+    def quitar(self, id_activo):
+        """Saca el equipo del inventario y lo devuelve (None si no existía)."""
+        lab, equipo = self._por_id.pop(id_activo, (None, None))
+        if equipo is not None:
+            self[lab].remove(equipo)
+            self._desindexar(equipo)
+            self._cambio()
+        return equipo
+
+    # ------------------------------------------------------------------
+    # Índices secundarios
+    # ------------------------------------------------------------------
+    def _indexar(self, equipo):
+        self._por_estado.setdefault(equipo.estado, {})[equipo.id_activo] = equipo
+        self._por_tipo.setdefault(type(equipo).__name__, {})[equipo.id_activo] = equipo
+        equipo._registro = self
+
+    def _desindexar(self, equipo):
+        self._por_estado.get(equipo.estado, {}).pop(equipo.id_activo, None)
+        self._por_tipo.get(type(equipo).__name__, {}).pop(equipo.id_activo, None)
+        equipo._registro = None
+
+    def _estado_cambiado(self, equipo, estado_anterior):
+        """Lo llama Equipo cuando cambia su estado (FALLA, reparación, baja...)."""
+        self._por_estado.get(estado_anterior, {}).pop(equipo.id_activo, None)
+        self._por_estado.setdefault(equipo.estado, {})[equipo.id_activo] = equipo
+        self._cambio()
+
+    def _equipo_cambiado(self, equipo):
+        """Lo llama Equipo cuando cambia algo que afecta su desgaste (historial, estrategia)."""
+        self._cambio()
+
+    def _cambio(self):
+        self.version = next(_VERSIONES)
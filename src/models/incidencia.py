@@ -0,0 +1,156 @@
+import sys
+from collections.abc import Mapping
+
+# Palabras que, en el último reporte, indican daño crítico detectado por la IA
+PALABRAS_CRITICAS = ("ALERTA", "CARBONIZADA", "CRITICO", "QUEMADO")
+
+
+def ticket_es_critico(ticket) -> bool:
+    """Indica si un reporte tiene cualquier rastro de daño crítico."""
+    # Revisamos tanto el detalle como el dictamen de la IA
+    texto_analisis = (str(ticket.get('dictamen_ia', '')) +
+                      str(ticket.get('detalle', ''))).upper()
+    return any(palabra in texto_analisis for palabra in PALABRAS_CRITICAS)
+
+
+# Severidad que se guarda con cada ticket y en el resumen del equipo (ultima_severidad)
+SEVERIDAD_CRITICA = "CRITICA"
+SEVERIDAD_NORMAL = "NORMAL"
+
+
+def severidad_de(ticket) -> str:
+    return SEVERIDAD_CRITICA if ticket_es_critico(ticket) else SEVERIDAD_NORMAL
+
+
+# Marca de "campo no informado" (distinta de None, que puede venir en el JSON)
+_AUSENTE = object()
+
+
+class Incidencia(Mapping):
+    """
+    Reporte compacto e inmutable: ocupa lo mismo que una tupla pequeña en vez de
+    un dict por ticket. Se lee igual que el dict de siempre (inc.get('fecha'),
+    inc['dictamen_ia'], 'dictamen_ia' in inc) y to_dict() devuelve el original.
+    """
+    __slots__ = ("fecha", "detalle", "dictamen_ia", "extra")
+
+    def __init__(self, fecha=_AUSENTE, detalle=_AUSENTE, dictamen_ia=_AUSENTE, extra=None):
+        # La fecha se repite entre equipos: la internamos para compartir el texto
+        self.fecha = sys.intern(fecha) if type(fecha) is str else fecha
+        self.detalle = detalle
+        self.dictamen_ia = dictamen_ia
+        self.extra = extra or None # Campos poco comunes (p. ej. 'reportado_por')
+
+    @classmethod
+    def desde(cls, ticket):
+        """Convierte un dict de la base en Incidencia (si ya lo es, lo devuelve tal cual)."""
+        if isinstance(ticket, Incidencia):
+            return ticket
+        datos = dict(ticket)
+        return cls(datos.pop('fecha', _AUSENTE), datos.pop('detalle', _AUSENTE),
+                   datos.pop('dictamen_ia', _AUSENTE), datos)
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def __getitem__(self, clave):
+        if clave in Incidencia.__slots__[:3]:
+            valor = getattr(self, clave)
+            if valor is not _AUSENTE:
+                return valor
+        elif self.extra is not None and clave in self.extra:
+            return self.extra[clave]
+        raise KeyError(clave)
+
+    def __iter__(self):
+        for clave in Incidencia.__slots__[:3]:
+            if getattr(self, clave) is not _AUSENTE:
+                yield clave
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __reduce__(self):
+        # _AUSENTE no sobrevive a pickle: viajamos como dict
+        return (Incidencia.desde, (self.to_dict(),))
+
+    def __repr__(self):
+        return f"Incidencia({self.to_dict()!r})"
+
+
+class HistorialIncidencias(list):
+    """
+    Lista de reportes de un equipo que avisa a su dueño cada vez que cambia.
+    Así el equipo recalcula la bandera crítica solo al registrar un reporte
+    (y no en cada lectura) e invalida su obsolescencia memorizada.
+    Los tickets se guardan como Incidencia aunque lleguen como dict.
+    """
+    __slots__ = ("_equipo",)
+
+    def __init__(self, tickets=(), equipo=None):
+        super().__init__(map(Incidencia.desde, tickets))
+        self._equipo = equipo
+
+    def __reduce__(self):
+        # Se copia sin dueño: Equipo.__setstate__ lo vuelve a enlazar
+        return (HistorialIncidencias, (list(self),))
+
+    def _avisar(self):
+        if self._equipo is not None:
+            self._equipo._historial_cambiado()
+
+    def append(self, ticket):
+        super().append(Incidencia.desde(ticket))
+        self._avisar()
+
+    def extend(self, tickets):
+        super().extend(map(Incidencia.desde, tickets))
+        self._avisar()
+
+    def insert(self, indice, ticket):
+        super().insert(indice, Incidencia.desde(ticket))
+        self._avisar()
+
+    def pop(self, indice=-1):
+        ticket = super().pop(indice)
+        self._avisar()
+        return ticket
+
+    def remove(self, ticket):
+        super().remove(ticket)
+        self._avisar()
+
+    def clear(self):
+        super().clear()
+        self._avisar()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._avisar()
+
+    def reverse(self):
+        super().reverse()
+        self._avisar()
+
+    def __setitem__(self, indice, valor):
+        if isinstance(indice, slice):
+            valor = [Incidencia.desde(ticket) for ticket in valor]
+        else:
+            valor = Incidencia.desde(valor)
+        super().__setitem__(indice, valor)
+        self._avisar()
+
+    def to_list(self) -> list:
+        """El historial como lista de dicts (formato JSON de la base)."""
+        return [ticket.to_dict() for ticket in self]
+
+    def __delitem__(self, indice):
+        super().__delitem__(indice)
+        self._avisar()
+
+    def __iadd__(self, tickets):
+        super().__iadd__(map(Incidencia.desde, tickets))
+        self._avisar()
+        return self
@@ -1,76 +1,279 @@
-import os
-from supabase import create_client
-from dotenv import load_dotenv
+from src.database.db import DatabaseConnection
+from src.interfaces.backend import COLUMNAS_LECTURA
+from src.utils.mapper import map_object_to_json, map_object_to_cambios, map_ticket_to_json, map_json_to_ticket
+from src.utils.metricas import medir, tramo
+
+# Filas por request en las operaciones masivas
+TAM_LOTE = 500
+# Ids por consulta al leer historiales en bloque (la lista viaja en la URL)
+IDS_POR_CONSULTA = 200
 
 class EquipoRepository:
-    def __init__(self):
-        
-        load_dotenv()
-        url = os.getenv("SUPABASE_URL")
-        key = os.getenv("SUPABASE_KEY")
-        
-        if not url or not key:
-            print("⚠️ ADVERTENCIA: No se encontraron las claves en .env")
-            self.client = None
-        else:
-            self.client = create_client(url, key)
+    def __init__(self, backend=None):
+        # Backend compartido por todo el proceso (Supabase o SQLite, según el .env)
+        self.backend = backend if backend is not None else DatabaseConnection.obtener_backend()
 
+    @medir("repo.guardar_equipo")
     def guardar_equipo(self, equipo):
-        """Guarda un equipo NUEVO en Supabase"""
-        if not self.client: return
+        """Guarda un equipo NUEVO en la base de datos"""
+        if not self.backend: return
         
-        # 1. Preparar los Detalles Técnicos (JSONB)
-        detalles = {}
-        # Extraemos atributos específicos según el tipo
-        if hasattr(equipo, 'hp'): detalles['hp'] = equipo.hp
-        if hasattr(equipo, 'voltaje'): detalles['voltaje'] = equipo.voltaje
-        if hasattr(equipo, 'rpm'): detalles['rpm'] = equipo.rpm
-        if hasattr(equipo, 'ancho_banda'): detalles['ancho_banda'] = equipo.ancho_banda
-        if hasattr(equipo, 'precision'): detalles['precision'] = equipo.precision
-    
-
-    # Si el objeto no tiene el atributo, por defecto usa 'Sin Ubicación'
-        ubicacion_final = getattr(equipo, 'ubicacion', 'Sin Ubicación')
-        datos_para_nube = {
-            "id_activo": equipo.id_activo,
-            "modelo": equipo.modelo,
-            "tipo_equipo": type(equipo).__name__,
-            "fecha_compra": str(equipo.fecha_compra),
-    
-    # --- CAMBIO CRÍTICO: Usar la ubicación real del equipo ---
-            "ubicacion": getattr(equipo, 'ubicacion', 'Sin Ubicación'), 
-            "estrategia_nombre": "DesgasteLineal" if "Lineal" in str(type(equipo.estrategia_desgaste)) else "DesgasteExponencial",
-            "detalles_tecnicos": detalles,
-            "historial_incidencias": equipo.historial_incidencias
-}
+        datos_para_nube = map_object_to_json(equipo)
         try:
-            self.client.table("equipos").insert(datos_para_nube).execute()
-            print(f"✅ Guardado en {ubicacion_final}: {equipo.modelo}")
+            self.backend.insertar([datos_para_nube])
+            print(f"✅ Guardado en {datos_para_nube['ubicacion']}: {equipo.modelo}")
         except Exception as e:
             print(f"❌ Error: {e}")
+            return
+        self._guardar_historiales([equipo])
+
+    @medir("repo.guardar_equipos")
+    def guardar_equipos(self, equipos, tam_lote=TAM_LOTE):
+        """
+        Guarda MUCHOS equipos nuevos con inserts de varias filas (un request por lote).
+        Devuelve {"ok": [ids guardados], "errores": {id_activo: mensaje}}.
+        """
+        equipos = list(equipos)
+        resultado = self._enviar_en_lotes(equipos, tam_lote, lambda filas: self.backend.insertar(filas))
+        guardados = set(resultado["ok"])
+        self._guardar_historiales([e for e in equipos if e.id_activo in guardados], tam_lote)
+        return resultado
+
+    def _guardar_historiales(self, equipos, tam_lote=TAM_LOTE):
+        """Tickets que los equipos nuevos ya traían en memoria (p. ej. datos de ejemplo)."""
+        filas = [map_ticket_to_json(e.id_activo, ticket) for e in equipos for ticket in e.historial_incidencias]
+        for inicio in range(0, len(filas), tam_lote):
+            try:
+                self.backend.insertar_incidencias(filas[inicio:inicio + tam_lote])
+            except Exception as e:
+                print(f"❌ Error guardando historiales: {e}")
+
+    @medir("repo.actualizar_equipos")
+    def actualizar_equipos(self, equipos, tam_lote=TAM_LOTE):
+        """
+        Actualiza (o crea si no existen) MUCHOS equipos con upsert sobre id_activo.
+        Devuelve {"ok": [ids actualizados], "errores": {id_activo: mensaje}}.
+        """
+        return self._enviar_en_lotes(equipos, tam_lote, lambda filas: self.backend.upsert(filas))
+
+    @medir("repo.actualizar_campos")
+    def actualizar_campos(self, filas, tam_lote=IDS_POR_CONSULTA):
+        """
+        Guarda cambios parciales (filas de map_object_to_cambios) con updates filtrados
+        por id_activo: solo se tocan esas columnas y un equipo borrado no se vuelve a crear.
+        Las filas con los mismos valores viajan juntas en un solo update.
+        Devuelve {"ok": [ids enviados], "errores": {id_activo: mensaje}}.
+        """
+        resultado = {"ok": [], "errores": {}}
+        grupos = {}
+        for fila in filas:
+            datos = {c: v for c, v in fila.items() if c != "id_activo"}
+            grupos.setdefault(tuple(sorted(datos.items())), []).append(fila["id_activo"])
+
+        for valores, ids in grupos.items():
+            for inicio in range(0, len(ids), tam_lote):
+                lote = ids[inicio:inicio + tam_lote]
+                if not self.backend:
+                    resultado["errores"].update((id_activo, "Sin conexión a la base de datos") for id_activo in lote)
+                    continue
+                try:
+                    self.backend.actualizar_varios(lote, dict(valores))
+                    resultado["ok"].extend(lote)
+                except Exception as e:
+                    resultado["errores"].update((id_activo, str(e)) for id_activo in lote)
+
+        print(f"✅ {len(resultado['ok'])} equipos actualizados, ❌ {len(resultado['errores'])} con error")
+        return resultado
 
-    def leer_todos(self):
-        """Descarga TODOS los equipos de la nube"""
-        if not self.client: return []
+    def _enviar_en_lotes(self, equipos, tam_lote, enviar):
+        resultado = {"ok": [], "errores": {}}
+
+        # 1. Serializamos: si un equipo no se puede convertir, solo falla esa fila
+        filas = []
+        for equipo in equipos:
+            id_activo = getattr(equipo, 'id_activo', None)
+            if not self.backend:
+                resultado["errores"][id_activo] = "Sin conexión a la base de datos"
+                continue
+            try:
+                filas.append(map_object_to_json(equipo))
+            except Exception as e:
+                resultado["errores"][id_activo] = f"No se pudo serializar: {e}"
+
+        # 2. Enviamos por lotes; si un lote falla, lo reintentamos fila por fila
+        #    para saber exactamente qué filas son las que fallan
+        for inicio in range(0, len(filas), tam_lote):
+            lote = filas[inicio:inicio + tam_lote]
+            try:
+                enviar(lote)
+                resultado["ok"].extend(fila["id_activo"] for fila in lote)
+                continue
+            except Exception as e:
+                if len(lote) == 1:
+                    resultado["errores"][lote[0]["id_activo"]] = str(e)
+                    continue
+            for fila in lote:
+                try:
+                    enviar([fila])
+                    resultado["ok"].append(fila["id_activo"])
+                except Exception as e:
+                    resultado["errores"][fila["id_activo"]] = str(e)
+
+        print(f"✅ {len(resultado['ok'])} equipos enviados, ❌ {len(resultado['errores'])} con error")
+        return resultado
+
+    @medir("repo.leer_todos")
+    def leer_todos(self, columnas=COLUMNAS_LECTURA):
+        """Descarga TODOS los equipos de la base de datos (solo las columnas pedidas)"""
+        if not self.backend: return []
         try:
-            response = self.client.table("equipos").select("*").execute()
-            return response.data # Devuelve una lista de diccionarios
+            return self.backend.leer_todos(columnas) # Devuelve una lista de diccionarios
         except Exception as e:
             print(f"❌ Error leyendo base de datos: {e}")
             return []
 
+    def leer_paginado(self, tam_pagina=1000, columnas=COLUMNAS_LECTURA):
+        """
+        Descarga los equipos por páginas (keyset pagination sobre id_activo).
+        Es un generador: entrega cada página (lista de diccionarios) apenas llega,
+        así nunca se tiene la tabla completa en memoria.
+        'columnas' debe incluir id_activo (es la clave de la paginación).
+        Si una página falla, la excepción se propaga: cortar en silencio haría pasar
+        una flota a medias por completa.
+        """
+        if not self.backend: return
+        ultimo_id = None
+        while True:
+            try:
+                # Es un generador: se mide cada página, no el tiempo que tarda quien la consume
+                with tramo("repo.leer_pagina"):
+                    pagina = self.backend.leer_pagina(ultimo_id, tam_pagina, columnas)
+            except Exception as e:
+                print(f"❌ Error leyendo página de equipos (después de {ultimo_id}): {e}")
+                raise
+            if not pagina: return
+            yield pagina
+            if len(pagina) < tam_pagina: return
+            ultimo_id = pagina[-1]["id_activo"]
+
+    @medir("repo.leer_cambios_desde")
+    def leer_cambios_desde(self, marca, tam_pagina=1000):
+        """
+        Descarga SOLO los equipos modificados desde la marca de agua 'marca'
+        (columna actualizado_en, ver src/database/migraciones.sql).
+        Usa '>=' a propósito: reaplicar una fila repetida no hace daño y así
+        no se pierden filas que comparten la misma marca.
+        Pagina por (actualizado_en, id_activo) y no por posición: una fila que cambia
+        durante la lectura se mueve al final, pero no corre a las demás.
+        Devuelve None si la lectura falla, para que el llamador recargue todo.
+        """
+        if not self.backend: return None
+        cambios = []
+        despues_de = None
+        try:
+            while True:
+                pagina = self.backend.leer_cambios(marca, despues_de, tam_pagina)
+                cambios.extend(pagina)
+                if len(pagina) < tam_pagina: return cambios
+                despues_de = (pagina[-1]["actualizado_en"], pagina[-1]["id_activo"])
+        except Exception as e:
+            print(f"❌ Error leyendo cambios: {e}")
+            return None
+
+    @medir("repo.contar_equipos")
+    def contar_equipos(self):
+        """Cantidad de filas en la base (sin descargarlas). None si falla."""
+        if not self.backend: return None
+        try:
+            return self.backend.contar()
+        except Exception as e:
+            print(f"❌ Error contando equipos: {e}")
+            return None
+
+    @medir("repo.resumen_equipos")
+    def resumen_equipos(self):
+        """{"filas", "huella"} de la tabla (ver IBackendEquipos.resumen). None si falla."""
+        if not self.backend: return None
+        try:
+            return self.backend.resumen()
+        except Exception as e:
+            print(f"❌ Error leyendo el resumen de equipos: {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Incidencias (tabla append-only)
+    # ------------------------------------------------------------------
+    @medir("repo.registrar_incidencia")
+    def registrar_incidencia(self, id_activo, ticket) -> bool:
+        """
+        Agrega UN ticket al registro de incidencias: un insert de una sola fila,
+        sin reenviar el historial. El resumen del equipo lo actualiza el backend.
+        """
+        if not self.backend: return False
+        try:
+            self.backend.insertar_incidencias([map_ticket_to_json(id_activo, ticket)])
+            return True
+        except Exception as e:
+            print(f"❌ Error registrando incidencia de {id_activo}: {e}")
+            return False
+
+    @medir("repo.leer_incidencias")
+    def leer_incidencias(self, id_activo, inicio=0, limite=50):
+        """Tickets de un equipo en orden de llegada (rango [inicio, inicio + limite)). None si falla."""
+        if not self.backend: return None
+        try:
+            return [map_json_to_ticket(fila) for fila in self.backend.leer_incidencias(id_activo, inicio, limite)]
+        except Exception as e:
+            print(f"❌ Error leyendo incidencias de {id_activo}: {e}")
+            return None
+
+    @medir("repo.leer_historial")
+    def leer_historial(self, id_activo, tam_pagina=1000):
+        """Historial completo de un equipo (todas las páginas). None si falla."""
+        historial = []
+        inicio = 0
+        while True:
+            pagina = self.leer_incidencias(id_activo, inicio, tam_pagina)
+            if pagina is None: return None
+            historial.extend(pagina)
+            if len(pagina) < tam_pagina: return historial
+            inicio += tam_pagina
+
+    @medir("repo.leer_incidencias_de")
+    def leer_incidencias_de(self, ids, tam_pagina=1000):
+        """
+        Historiales de varios equipos en pocas consultas: {id_activo: [tickets]}.
+        Los equipos sin tickets no aparecen. None si falla.
+        """
+        if not self.backend: return None
+        ids = list(dict.fromkeys(ids))
+        historiales = {}
+        try:
+            for i in range(0, len(ids), IDS_POR_CONSULTA):
+                grupo = ids[i:i + IDS_POR_CONSULTA]
+                inicio = 0
+                while True:
+                    pagina = self.backend.leer_incidencias_de(grupo, inicio, tam_pagina)
+                    for fila in pagina:
+                        historiales.setdefault(fila["id_activo"], []).append(map_json_to_ticket(fila))
+                    if len(pagina) < tam_pagina: break
+                    inicio += tam_pagina
+        except Exception as e:
+            print(f"❌ Error leyendo historiales: {e}")
+            return None
+        return historiales
+
+    @medir("repo.actualizar_equipo")
     def actualizar_equipo(self, equipo):
-        """Actualiza un equipo existente (Para cuando agregas reportes o cambias estrategia)"""
-        if not self.client: return
+        """Actualiza un equipo existente (estado y estrategia; los reportes van por registrar_incidencia)"""
+        if not self.backend: return
+
+        datos_actualizados = map_object_to_cambios(equipo)
+        del datos_actualizados["id_activo"]
 
-        datos_actualizados = {
-            "historial_incidencias": equipo.historial_incidencias,
-            "estrategia_nombre": "DesgasteLineal" if "Lineal" in str(type(equipo.estrategia_desgaste)) else "DesgasteExponencial"
-        }
-        
         try:
             # Busca por id_activo y actualiza
-            self.client.table("equipos").update(datos_actualizados).eq("id_activo", equipo.id_activo).execute()
+            self.backend.actualizar(equipo.id_activo, datos_actualizados)
             print(f"✅ Actualizado: {equipo.modelo}")
         except Exception as e:
             print(f"❌ Error actualizando: {e}")
\ No newline at end of file
@@ -1,48 +1,42 @@
 import numpy as np
-from sklearn.linear_model import LinearRegression
-import matplotlib.pyplot as plt
+import io
 from datetime import datetime, timedelta
 
-class PredictiveService:
-    def generar_prediccion(self, equipo):
-        # 1. Calculamos los días que han pasado desde la compra
-        try:
-            fecha_compra = datetime.strptime(equipo.fecha_compra, "%Y-%m-%d")
-        except ValueError:
-            fecha_compra = datetime.now() - timedelta(days=365) # Valor por defecto si falla
-            
-        hoy = datetime.now()
-        dias_uso = (hoy - fecha_compra).days
-        
-        if dias_uso <= 0:
-            dias_uso = 1 # Para evitar errores matemáticos
-
-        desgaste_actual = equipo.calcular_obsolescencia()
+from src.logical.obsolescencia import calcular_obsolescencia_flota
+from src.utils.cache import CacheLRU
+from src.utils.metricas import medir
 
-        # 2. Simulamos la data histórica (Día 0 = 0% desgaste, Hoy = Desgaste actual)
-        X = np.array([[0], [dias_uso // 2], [dias_uso]])
-        y = np.array([0, desgaste_actual / 2.1, desgaste_actual])
+# Si no hay desgaste, asumimos 10 años
+DIAS_SIN_DESGASTE = 3650
 
-        # 3. Entrenamos el modelo de IA (Regresión Lineal)
-        modelo = LinearRegression()
-        modelo.fit(X, y)
+# Gráficos ya renderizados (PNG), compartidos por todas las sesiones del proceso
+GRAFICOS_MAX_ENTRADAS = 256
+_CACHE_GRAFICOS = CacheLRU(GRAFICOS_MAX_ENTRADAS)
 
-        # 4. Predecimos cuándo el desgaste llegará a 1.0 (100% = Falla total)
-        m = modelo.coef_[0]
-        b = modelo.intercept_
-        
-        if m <= 0:
-            dias_para_falla = 3650 # Si no hay desgaste, asumimos 10 años
-        else:
-            dias_para_falla = (1.0 - b) / m
+class PredictiveService:
+    @medir("prediccion.generar_prediccion")
+    def generar_prediccion(self, equipo):
+        # 1-4. Días de uso, recta de desgaste y fecha de falla: el mismo cálculo
+        #      que predecir_flota(), aplicado a un solo equipo
+        desgaste_actual = equipo.calcular_obsolescencia()
+        hoy = datetime.now().date()
+        fecha_compra, dias_uso = _dias_de_uso([equipo.fecha_compra], hoy)
+        m, b = _recta_de_desgaste(dias_uso, np.array([desgaste_actual], dtype=float))
+        dias_para_falla = _dias_para_falla(m, b)
+        fecha_falla = fecha_compra + dias_para_falla.astype("timedelta64[D]")
 
-        fecha_falla = fecha_compra + timedelta(days=int(dias_para_falla))
+        dias_uso, m, b = int(dias_uso[0]), float(m[0]), float(b[0])
+        dias_para_falla = float(DIAS_SIN_DESGASTE if m <= 0 else (1.0 - b) / m)
 
         # 5. Generamos el Gráfico Visual
-        fig, ax = plt.subplots(figsize=(6, 4))
-        
-        x_pred = np.array([[0], [dias_uso], [dias_para_falla]])
-        y_pred = modelo.predict(x_pred)
+        # Figure directa (sin pyplot): no queda registrada en el estado global y se libera sola.
+        # matplotlib se importa recién al dibujar el primer gráfico
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=(6, 4))
+        ax = fig.subplots()
+
+        x_pred = np.array([0, dias_uso, dias_para_falla])
+        y_pred = m * x_pred + b
 
         # Dibujamos las líneas
         ax.plot(x_pred, y_pred, color='red', linestyle='--', label='Tendencia IA')
@@ -56,4 +50,98 @@ class PredictiveService:
         ax.legend()
         ax.grid(True, alpha=0.3)
 
-        return fecha_falla.strftime("%Y-%m-%d"), fig
\ No newline at end of file
+        return str(fecha_falla[0]), fig
+
+    @medir("prediccion.generar_prediccion_png")
+    def generar_prediccion_png(self, equipo):
+        """
+        Igual que generar_prediccion(), pero devuelve el gráfico ya renderizado a PNG.
+        Se cachea por (equipo, desgaste, estrategia, día): mientras nada de eso cambie,
+        el gráfico se reutiliza sin volver a dibujarlo.
+        """
+        estrategia = getattr(equipo, 'estrategia_desgaste', None)
+        clave = (equipo.id_activo, equipo.modelo, equipo.fecha_compra, equipo.calcular_obsolescencia(),
+                 type(estrategia).__name__ if estrategia is not None else None, datetime.now().date())
+        resultado = _CACHE_GRAFICOS.obtener(clave)
+        if resultado is None:
+            fecha_falla, fig = self.generar_prediccion(equipo)
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png")
+            fig.clear()
+            resultado = (fecha_falla, buffer.getvalue())
+            _CACHE_GRAFICOS.guardar(clave, resultado)
+        return resultado
+
+    @medir("prediccion.predecir_flota")
+    def predecir_flota(self, equipos, desgastes=None):
+        """
+        Fecha de falla estimada de TODA la flota en un solo paso vectorizado.
+        Da exactamente las mismas fechas que generar_prediccion() equipo por equipo.
+        'desgastes' permite reutilizar las obsolescencias ya calculadas (mismo orden).
+        Devuelve un pandas.DataFrame.
+        """
+        import pandas as pd
+
+        equipos = list(equipos)
+        if desgastes is None:
+            desgastes = calcular_obsolescencia_flota(equipos)
+        desgastes = np.asarray(desgastes, dtype=float)
+
+        fecha_compra, dias_uso = _dias_de_uso([eq.fecha_compra for eq in equipos], datetime.now().date())
+        m, b = _recta_de_desgaste(dias_uso, desgastes)
+        dias_para_falla = _dias_para_falla(m, b)
+
+        return pd.DataFrame({
+            "id_activo": [eq.id_activo for eq in equipos],
+            "modelo": [eq.modelo for eq in equipos],
+            "dias_uso": dias_uso,
+            "desgaste": desgastes,
+            "dias_para_falla": dias_para_falla,
+            "fecha_falla": fecha_compra + dias_para_falla.astype("timedelta64[D]"),
+        })
+
+
+def _dias_de_uso(fechas_compra, hoy):
+    """
+    Fechas de compra (datetime64[D]) y días de uso (mínimo 1) de cada equipo.
+    Cada fecha distinta se interpreta una sola vez; si no es 'YYYY-MM-DD',
+    se asume que el equipo se compró hace un año.
+    """
+    valores, inversos = np.unique(np.asarray(fechas_compra, dtype=str), return_inverse=True)
+    por_defecto = hoy - timedelta(days=365)
+
+    def interpretar(texto):
+        try:
+            return datetime.strptime(texto, "%Y-%m-%d").date()
+        except ValueError:
+            return por_defecto
+
+    fechas = np.array([interpretar(v) for v in valores], dtype="datetime64[D]")[inversos]
+    dias_uso = (np.datetime64(hoy, "D") - fechas).astype(np.int64)
+    return fechas, np.maximum(dias_uso, 1)
+
+
+def _recta_de_desgaste(dias_uso, desgaste):
+    """
+    Regresión lineal (mínimos cuadrados) sobre la historia simulada de cada equipo:
+    Día 0 = 0% desgaste, mitad de la vida = desgaste / 2.1, hoy = desgaste actual.
+    Forma cerrada y vectorizada: devuelve las pendientes y ordenadas de toda la flota.
+    """
+    x = np.stack([np.zeros(len(dias_uso)), dias_uso // 2, dias_uso]).astype(float)
+    y = np.stack([np.zeros(len(desgaste)), desgaste / 2.1, desgaste])
+    dx = x - x.mean(axis=0)
+    dy = y - y.mean(axis=0)
+    m = (dx * dy).sum(axis=0) / (dx * dx).sum(axis=0)
+    b = y.mean(axis=0) - m * x.mean(axis=0)
+    return m, b
+
+
+def _dias_para_falla(m, b):
+    """
+    Días desde la compra hasta que la recta llega a 1.0 (100% = Falla total), truncados.
+    Se redondea a 9 decimales antes de truncar para que un día exacto (p. ej. 0.9999999999
+    por error de punto flotante) no se pierda.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dias = np.where(m <= 0, DIAS_SIN_DESGASTE, (1.0 - b) / m)
+    return np.trunc(np.round(dias, 9)).astype(np.int64)
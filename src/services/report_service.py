@@ -0,0 +1,174 @@
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from src.utils.metricas import medir
+from src.utils.procesos import contexto_procesos
+
+# Documentos en vuelo por proceso: acota lo que hay en memoria mientras se arma el ZIP
+DOCUMENTOS_EN_VUELO = 2
+
+
+# --- Función PDF Profesional ---
+@medir("reporte.generar_pdf")
+def generar_pdf(equipo, lab):
+    """Ficha técnica de un equipo (bytes del PDF)."""
+    from fpdf import FPDF  # Solo se carga cuando alguien pide un reporte
+    pdf = FPDF()
+    _escribir_ficha(pdf, equipo, lab)
+    return pdf.output(dest='S').encode('latin-1', 'ignore')
+
+@medir("reporte.generar_pdf_laboratorio")
+def generar_pdf_laboratorio(equipos, lab):
+    """Un solo PDF con la ficha técnica de cada equipo del laboratorio (una página por equipo)."""
+    from fpdf import FPDF
+    pdf = FPDF()
+    for equipo in equipos:
+        _escribir_ficha(pdf, equipo, lab)
+    return pdf.output(dest='S').encode('latin-1', 'ignore')
+
+def _escribir_ficha(pdf, equipo, lab):
+    pdf.add_page()
+
+    # TÍTULO
+    pdf.set_font('Arial', 'B', 16)
+    pdf.cell(0, 10, f'FICHA TECNICA: {equipo.modelo}', 0, 1, 'C')
+    pdf.ln(5)
+
+    # INFO GENERAL
+    pdf.set_font('Arial', '', 11)
+    pdf.cell(0, 8, f"ID Activo: {equipo.id_activo}", 0, 1)
+    pdf.cell(0, 8, f"Ubicacion: {lab}", 0, 1)
+    pdf.cell(0, 8, f"Fecha Compra: {equipo.fecha_compra}", 0, 1)
+    pdf.cell(0, 8, f"Estado Actual: {equipo.estado.name}", 0, 1)
+
+    # RESULTADOS
+    obs = equipo.calcular_obsolescencia()
+    pdf.set_font('Arial', 'B', 11)
+    pdf.cell(0, 8, f"Nivel de Desgaste Calculado: {obs*100:.2f}%", 0, 1)
+    pdf.ln(5)
+
+    # HISTORIAL
+    pdf.set_font('Arial', 'B', 12)
+    pdf.cell(0, 10, "Historial de Mantenimiento e Incidencias:", 0, 1)
+    pdf.set_font('Arial', '', 10)
+
+    if equipo.historial_incidencias:
+        for inc in equipo.historial_incidencias:
+            fecha = inc.get('fecha', '-')
+            # Limpieza de caracteres (emojis) para evitar crash
+            texto = inc.get('detalle', '-').encode('latin-1', 'ignore').decode('latin-1')
+            dictamen = inc.get('dictamen_ia', '')
+
+            pdf.multi_cell(0, 6, f"[{fecha}] {texto}")
+            if dictamen:
+                dic_clean = dictamen.encode('latin-1', 'ignore').decode('latin-1')
+                pdf.set_font('Arial', 'I', 9)
+                pdf.multi_cell(0, 6, f"   >> Dictamen IA: {dic_clean}")
+                pdf.set_font('Arial', '', 10)
+            pdf.ln(2)
+    else:
+        pdf.cell(0, 10, "Sin registros de mantenimiento.", 0, 1)
+
+
+class ReportService:
+    """
+    Reportes masivos para auditorías: fichas técnicas de todo un laboratorio
+    (o de toda la facultad) generadas en paralelo y escritas en un ZIP a medida
+    que cada documento termina, sin juntar todos los PDFs en memoria.
+    """
+
+    def __init__(self, sync=None):
+        # SyncService para precargar en bloque los historiales (se crea al usarlo)
+        self.sync = sync
+
+    @medir("reporte.generar_zip")
+    def generar_zip(self, registro, destino, laboratorios=None, por_laboratorio=False, procesos=None):
+        """
+        Escribe en 'destino' (ruta o archivo binario) un ZIP con:
+        - por_laboratorio=False: un PDF por equipo, en una carpeta por laboratorio.
+        - por_laboratorio=True: un PDF por laboratorio con todas sus fichas.
+        'registro' es lab -> [equipos] (p. ej. db_laboratorios); 'laboratorios'
+        limita los laboratorios incluidos. Devuelve la cantidad de documentos.
+        """
+        grupos = {lab: list(equipos) for lab, equipos in registro.items()
+                  if equipos and (laboratorios is None or lab in laboratorios)}
+
+        # 1. Historiales en bloque: una consulta por tanda de ids, no una por equipo
+        self._precargar_historiales([eq for equipos in grupos.values() for eq in equipos])
+
+        # 2. Tareas: (nombre dentro del ZIP, laboratorio, equipo o lista de equipos)
+        if por_laboratorio:
+            tareas = [(f"Reporte_{lab}.pdf", lab, equipos) for lab, equipos in grupos.items()]
+        else:
+            tareas = [(f"{lab}/Reporte_{eq.id_activo}.pdf", lab, eq)
+                      for lab, equipos in grupos.items() for eq in equipos]
+
+        # 3. Cada documento se escribe en el ZIP apenas está listo
+        documentos = 0
+        with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as archivo_zip:
+            for nombre, pdf_bytes in self._generar_stream(tareas, procesos):
+                archivo_zip.writestr(nombre, pdf_bytes)
+                documentos += 1
+        return documentos
+
+    def _precargar_historiales(self, equipos):
+        if not equipos:
+            return
+        if self.sync is None:
+            from src.services.sync_service import SyncService
+            self.sync = SyncService()
+        if not self.sync.precargar_historiales(equipos):
+            print("⚠️ No se pudieron precargar los historiales; cada equipo leerá el suyo")
+
+    def _generar_stream(self, tareas, procesos=None):
+        """Produce (nombre, bytes) de cada documento en el orden en que terminan."""
+        procesos = min(procesos or os.cpu_count() or 1, len(tareas))
+        if procesos <= 1:
+            for tarea in tareas:
+                yield _generar_documento(tarea)
+            return
+
+        # Ventana acotada: no se encolan todas las tareas (ni sus PDFs) de una vez
+        pendientes = iter(tareas)
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto_procesos()) as pool:
+            en_vuelo = set()
+            for tarea in pendientes:
+                en_vuelo.add(pool.submit(_generar_documento, tarea))
+                if len(en_vuelo) >= procesos * DOCUMENTOS_EN_VUELO:
+                    listos, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                    for futuro in listos:
+                        yield futuro.result()
+            for futuro in wait(en_vuelo).done:
+                yield futuro.result()
+
+
+def _generar_documento(tarea):
+    nombre, lab, contenido = tarea
+    if isinstance(contenido, list):
+        return nombre, generar_pdf_laboratorio(contenido, lab)
+    return nombre, generar_pdf(contenido, lab)
+
+
+if __name__ == "__main__":
+    # Uso: python -m src.services.report_service salida.zip [--laboratorio LAB ...] [--por-laboratorio] [--procesos N]
+    import argparse
+
+    from src.logical.estrategias import DesgasteLineal, DesgasteExponencial
+    from src.services.sync_service import SyncService
+
+    parser = argparse.ArgumentParser(description="Fichas técnicas en PDF de laboratorios completos, en un ZIP")
+    parser.add_argument("salida", help="Ruta del ZIP a generar")
+    parser.add_argument("--laboratorio", action="append", help="Solo este laboratorio (se puede repetir)")
+    parser.add_argument("--por-laboratorio", action="store_true", help="Un PDF por laboratorio en lugar de uno por equipo")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos en paralelo (por defecto, uno por núcleo)")
+    args = parser.parse_args()
+
+    sync = SyncService()
+    registro, estado_sync = sync.carga_completa(DesgasteLineal(), DesgasteExponencial())
+    if SyncService.carga_incompleta(estado_sync):
+        parser.exit(1, "❌ No se pudo descargar la flota completa; no se generan reportes parciales.\n")
+    documentos = ReportService(sync).generar_zip(
+        registro, args.salida, args.laboratorio, args.por_laboratorio, args.procesos
+    )
+    print(f"📦 {documentos} documentos escritos en {args.salida}")
@@ -0,0 +1,158 @@
+import json
+import os
+import tempfile
+import threading
+
+from src.interfaces.backend import COLUMNAS_LECTURA
+
+# Copia local de la flota (Arrow IPC): vacío para desactivarla
+RUTA_SNAPSHOT = os.getenv("FIEE_SNAPSHOT_PATH", "fiee_flota.arrow")
+# Si cambia el formato de las columnas, los snapshots viejos se ignoran
+VERSION_FORMATO = "1"
+
+# Las sesiones de Streamlit son hilos del mismo proceso: el reemplazo del snapshot se hace
+# de a uno, y una carga que termina tarde no pisa un snapshot con una marca más nueva
+_LOCK_CONFIRMAR = threading.Lock()
+_MARCAS_PUBLICADAS = {}
+
+COLUMNAS_JSON = ("detalles_tecnicos",)
+COLUMNAS_ENTERAS = ("total_incidencias",)
+
+
+def _pyarrow():
+    """pyarrow es opcional: sin él no hay snapshot y todo se lee de la base."""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        return pyarrow
+    except ImportError:
+        return None
+
+
+class SnapshotFlota:
+    """
+    Copia en disco de las filas de la flota (las mismas que devuelve la base),
+    en formato columnar Arrow IPC. Se escribe al terminar una carga completa y se
+    abre con memory-map al arrancar: una sesión nueva arma el inventario en
+    milisegundos y después se reconcilia con la base usando la marca de agua
+    guardada en el propio archivo (ver SyncService.carga_inicial).
+    """
+
+    def __init__(self, ruta=RUTA_SNAPSHOT):
+        self.ruta = ruta
+
+    def _esquema(self, pa):
+        return pa.schema([
+            (columna, pa.int64() if columna in COLUMNAS_ENTERAS else pa.string())
+            for columna in COLUMNAS_LECTURA
+        ])
+
+    def escritor(self):
+        """EscritorSnapshot nuevo, o None si el snapshot está desactivado o no hay pyarrow."""
+        pa = _pyarrow()
+        if not self.ruta or pa is None:
+            return None
+        try:
+            return EscritorSnapshot(pa, self._esquema(pa), self.ruta)
+        except OSError as e:
+            print(f"⚠️ No se pudo crear el snapshot de la flota: {e}")
+            return None
+
+    def leer(self):
+        """
+        Devuelve (páginas, estado_sync) o None si no hay snapshot válido.
+        'páginas' es un generador de listas de filas (diccionarios), igual que
+        EquipoRepository.leer_paginado; el archivo se lee con memory-map.
+        """
+        pa = _pyarrow()
+        if not self.ruta or pa is None or not os.path.exists(self.ruta):
+            return None
+        try:
+            # Sin copiar: las columnas apuntan al archivo mapeado (el SO comparte esas páginas entre sesiones)
+            lector = pa.ipc.open_file(pa.memory_map(self.ruta))
+            tabla = lector.read_all()
+            # La marca de agua viaja en el último lote (vacío), que se escribe al confirmar
+            metadatos = {}
+            if lector.num_record_batches:
+                _, extra = lector.get_batch_with_custom_metadata(lector.num_record_batches - 1)
+                metadatos = {k.decode(): v.decode() for k, v in (extra or {}).items()}
+        except (OSError, pa.ArrowException) as e:
+            print(f"⚠️ Snapshot de la flota ilegible, se ignora: {e}")
+            return None
+
+        if metadatos.get("version_formato") != VERSION_FORMATO or tabla.schema != self._esquema(pa):
+            return None
+        estado_sync = {"marca": metadatos.get("marca") or None, "filas": int(metadatos.get("filas", 0))}
+        return _paginas(tabla), estado_sync
+
+
+class EscritorSnapshot:
+    """
+    Escribe el snapshot página por página (sin juntar la tabla en memoria) en un
+    archivo temporal propio (varias cargas pueden escribir a la vez); recién al
+    confirmar reemplaza al snapshot anterior.
+    """
+
+    def __init__(self, pa, esquema, ruta):
+        self._pa = pa
+        self._esquema = esquema
+        self._ruta = ruta
+        # Mismo directorio que el snapshot, para que os.replace sea atómico
+        descriptor, self._temporal = tempfile.mkstemp(prefix=os.path.basename(ruta) + ".",
+                                                      suffix=".tmp", dir=os.path.dirname(ruta) or ".")
+        os.close(descriptor)
+        self._sink = pa.OSFile(self._temporal, "wb")
+        self._escritor = pa.ipc.new_file(self._sink, esquema)
+
+    def agregar(self, pagina):
+        columnas = {
+            columna: [json.dumps(fila.get(columna)) if columna in COLUMNAS_JSON else fila.get(columna)
+                      for fila in pagina]
+            for columna in self._esquema.names
+        }
+        self._escritor.write_batch(self._pa.record_batch(columnas, schema=self._esquema))
+
+    def confirmar(self, estado_sync):
+        """Cierra el archivo con la marca de agua y reemplaza al snapshot anterior (atómico)."""
+        metadatos = {
+            "version_formato": VERSION_FORMATO,
+            "marca": estado_sync.get("marca") or "",
+            "filas": str(estado_sync.get("filas", 0)),
+        }
+        try:
+            vacio = self._pa.record_batch([[] for _ in self._esquema], schema=self._esquema)
+            self._escritor.write_batch(vacio, custom_metadata=metadatos)
+            self._escritor.close()
+            self._sink.close()
+            with _LOCK_CONFIRMAR:
+                ruta = os.path.abspath(self._ruta)
+                publicada = _MARCAS_PUBLICADAS.get(ruta)
+                if publicada is not None and metadatos["marca"] < publicada:
+                    os.remove(self._temporal)
+                    return
+                os.replace(self._temporal, self._ruta)
+                _MARCAS_PUBLICADAS[ruta] = metadatos["marca"]
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el snapshot de la flota: {e}")
+            self.descartar()
+
+    def descartar(self):
+        """La carga no terminó bien: el snapshot anterior queda como estaba."""
+        try:
+            self._escritor.close()
+            self._sink.close()
+        except Exception:
+            pass
+        try:
+            os.remove(self._temporal)
+        except OSError:
+            pass
+
+
+def _paginas(tabla):
+    for lote in tabla.to_batches():
+        filas = lote.to_pylist()
+        for fila in filas:
+            for columna in COLUMNAS_JSON:
+                fila[columna] = json.loads(fila[columna]) if fila[columna] is not None else None
+        yield filas
@@ -0,0 +1,241 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from src.interfaces.backend import huella_id
+from src.models.flota import RegistroFlota
+from src.repositories.equipo_repository import EquipoRepository
+from src.utils.mapper import map_item_to_object, map_json_to_object
+from src.utils.metricas import medir
+
+# Lecturas de reconciliación (después de arrancar desde el snapshot), fuera del hilo de la sesión
+_EN_SEGUNDO_PLANO = ThreadPoolExecutor(max_workers=2, thread_name_prefix="fiee-reconciliacion")
+
+# Cada lectura incremental empieza este tiempo antes de la última marca: una transacción
+# que tardó en confirmarse puede dejar visible una marca menor a otra ya leída
+SOLAPE_MARCA = timedelta(seconds=30)
+
+
+class CargadorHistorial:
+    """
+    Lo que guarda cada equipo para leer su historial a pedido (ver Equipo.diferir_historial).
+    Uno solo por carga, compartido por todos los equipos.
+    """
+
+    def __init__(self, repo=None):
+        self.repo = repo
+
+    def __call__(self, id_activo):
+        if self.repo is None:
+            self.repo = EquipoRepository()
+        return self.repo.leer_historial(id_activo)
+
+    def __getstate__(self):
+        # La conexión no viaja a otros procesos: allá se usa el backend por defecto
+        return {"repo": None}
+
+
+class SyncService:
+    """
+    Sincronización del inventario en memoria (db_laboratorios) con la base de datos.
+    La primera vez descarga todo; después solo pide las filas modificadas desde
+    la última marca de agua (columna actualizado_en) y las parcha en el registro.
+    estado_sync lleva la marca, la cantidad de filas vistas y la suma de sus
+    huellas (huella_id): si no coinciden con las de la base, hay un hueco.
+    Con un 'snapshot' (SnapshotFlota), cada carga completa deja una copia local
+    de la flota y carga_inicial() arranca desde ella.
+    """
+
+    def __init__(self, repo=None, snapshot=None):
+        self.repo = repo if repo is not None else EquipoRepository()
+        self.cargador = CargadorHistorial(self.repo)
+        self.snapshot = snapshot
+
+    @medir("sync.carga_inicial")
+    def carga_inicial(self, estrategia_lineal, estrategia_exponencial, laboratorios_dict=None):
+        """
+        Arranque de una sesión. Si hay snapshot local, arma el registro desde el disco
+        (sin tocar la red) y deja pedida en segundo plano la lectura de lo que cambió
+        desde su marca de agua: se aplica con aplicar_reconciliacion().
+        Si no hay snapshot, hace la carga completa (que lo deja escrito para la próxima).
+        """
+        leido = self.snapshot.leer() if self.snapshot is not None else None
+        if leido is None or leido[1]["marca"] is None:
+            return self.carga_completa(estrategia_lineal, estrategia_exponencial, laboratorios_dict)
+
+        paginas, estado_sync = leido
+        estado_sync["huella"] = 0
+        registro = RegistroFlota(laboratorios_dict)
+        for pagina in paginas:
+            estado_sync["huella"] += _huella(pagina)
+            for equipo in map_json_to_object(pagina, estrategia_lineal, estrategia_exponencial, self.cargador):
+                registro.agregar(equipo)
+
+        estado_sync["pendiente"] = _EN_SEGUNDO_PLANO.submit(self._leer_delta, estado_sync["marca"])
+        return registro, estado_sync
+
+    @staticmethod
+    def reconciliacion_pendiente(estado_sync) -> bool:
+        return bool(estado_sync) and "pendiente" in estado_sync
+
+    @staticmethod
+    def carga_incompleta(estado_sync) -> bool:
+        """Si la última carga completa se cortó y el registro tiene solo parte de la flota."""
+        return bool(estado_sync) and estado_sync.get("incompleta", False)
+
+    def aplicar_reconciliacion(self, registro, estado_sync, estrategia_lineal, estrategia_exponencial, esperar=True):
+        """
+        Aplica en el registro lo que leyó la reconciliación en segundo plano.
+        Devuelve el nuevo estado_sync (el mismo si no había nada pendiente, o si
+        esperar=False y la lectura no terminó), o None si hay que hacer carga completa.
+        """
+        futuro = estado_sync.get("pendiente") if estado_sync else None
+        if futuro is None or (not esperar and not futuro.done()):
+            return estado_sync
+        estado_sync = {clave: valor for clave, valor in estado_sync.items() if clave != "pendiente"}
+        cambios, resumen = futuro.result()
+        return self._aplicar_cambios(registro, estado_sync, cambios, resumen,
+                                     estrategia_lineal, estrategia_exponencial)
+
+    @medir("sync.carga_completa")
+    def carga_completa(self, estrategia_lineal, estrategia_exponencial, laboratorios_dict=None):
+        """
+        Descarga toda la tabla y devuelve (registro, estado_sync).
+        'registro' es un RegistroFlota (lab -> [equipos] con índice por id) y
+        'estado_sync' guarda la marca de agua, el total de filas vistas y su huella.
+        Los historiales NO se descargan: cada equipo lee el suyo al consultarlo.
+        Si la lectura se corta, 'registro' trae solo lo leído y estado_sync queda con
+        "incompleta": True y sin marca (la próxima sincronización recarga todo);
+        la vista avisa y ofrece reintentar. El snapshot no se escribe.
+        """
+        estado_sync = {"marca": None, "filas": 0, "huella": 0}
+        registro = RegistroFlota(laboratorios_dict)
+        escritor = self.snapshot.escritor() if self.snapshot is not None else None
+
+        try:
+            for pagina in self.repo.leer_paginado():
+                estado_sync["filas"] += len(pagina)
+                estado_sync["huella"] += _huella(pagina)
+                estado_sync["marca"] = _max_marca(estado_sync["marca"], pagina)
+                # Mapeamos y registramos cada página apenas llega
+                for equipo in map_json_to_object(pagina, estrategia_lineal, estrategia_exponencial, self.cargador):
+                    registro.agregar(equipo)
+                if escritor is not None:
+                    escritor.agregar(pagina)
+        except Exception as e:
+            if escritor is not None:
+                escritor.descartar()
+            print(f"⚠️ Carga completa interrumpida con {estado_sync['filas']} equipos: {e}")
+            estado_sync.update(marca=None, incompleta=True)
+            return registro, estado_sync
+        except BaseException:
+            if escritor is not None:
+                escritor.descartar()
+            raise
+
+        if escritor is not None:
+            # Solo se guarda una carga que coincide con la base (nadie borró ni agregó mientras tanto)
+            if estado_sync["filas"] and _coincide(estado_sync, self.repo.resumen_equipos()):
+                escritor.confirmar(estado_sync)
+            else:
+                escritor.descartar()
+
+        return registro, estado_sync
+
+    @medir("sync.sincronizar")
+    def sincronizar(self, registro, estado_sync, estrategia_lineal, estrategia_exponencial):
+        """
+        Aplica en el mismo registro los cambios ocurridos desde la última marca.
+        Devuelve el nuevo estado_sync, o None si se detecta un hueco
+        (sin marca, error de red o filas borradas) y hay que hacer carga completa.
+        """
+        if not isinstance(registro, RegistroFlota):
+            return None
+        if not estado_sync or estado_sync.get("marca") is None:
+            return None
+
+        cambios, resumen = self._leer_delta(estado_sync["marca"])
+        return self._aplicar_cambios(registro, estado_sync, cambios, resumen,
+                                     estrategia_lineal, estrategia_exponencial)
+
+    def _leer_delta(self, marca):
+        """
+        (filas modificadas desde 'marca' menos el solape, resumen de la base);
+        (None, None) si falla. Las filas del solape ya aplicadas se reaplican sin daño.
+        """
+        cambios = self.repo.leer_cambios_desde(_restar_solape(marca))
+        if cambios is None:
+            return None, None
+        return cambios, self.repo.resumen_equipos()
+
+    def _aplicar_cambios(self, registro, estado_sync, cambios, resumen, estrategia_lineal, estrategia_exponencial):
+        if cambios is None:
+            return None
+
+        # Una reconciliación que quedó pendiente ya no hace falta: esta lectura es más nueva
+        nuevo_estado = {clave: valor for clave, valor in estado_sync.items() if clave != "pendiente"}
+        if cambios:
+            for fila in cambios:
+                if not registro.contiene(fila.get("id_activo")):
+                    nuevo_estado["filas"] += 1
+                    if nuevo_estado.get("huella") is not None:
+                        nuevo_estado["huella"] += huella_id(fila["id_activo"])
+
+                # Un ticket nuevo también marca la fila: el historial se vuelve a leer a pedido
+                nuevo_obj = map_item_to_object(fila, estrategia_lineal, estrategia_exponencial, self.cargador)
+                if nuevo_obj is not None:
+                    # Reemplaza al equipo anterior y lo mueve si cambió de laboratorio
+                    registro.agregar(nuevo_obj)
+
+            nuevo_estado["marca"] = _max_marca(estado_sync["marca"], cambios)
+
+        # Detección de huecos: si la nube no tiene las mismas filas que vimos, recargamos todo
+        # (la huella detecta también un borrado más un alta, que dejan igual la cantidad)
+        if not _coincide(nuevo_estado, resumen):
+            return None
+
+        return nuevo_estado
+
+    def precargar_historiales(self, equipos):
+        """
+        Para reportes y PDFs de muchos equipos: lee en bloque los historiales que
+        falten, en vez de una consulta por equipo. Devuelve False si la lectura falla
+        (los equipos quedan sin cargar y cada uno lo intentará a pedido).
+        """
+        pendientes = {e.id_activo: e for e in equipos if not e.historial_cargado()}
+        if not pendientes:
+            return True
+        historiales = self.repo.leer_incidencias_de(list(pendientes))
+        if historiales is None:
+            return False
+        for id_activo, equipo in pendientes.items():
+            equipo.historial_incidencias = historiales.get(id_activo, [])
+        return True
+
+
+def _huella(filas):
+    return sum(huella_id(fila["id_activo"]) for fila in filas)
+
+def _coincide(estado_sync, resumen):
+    """Si la base tiene las mismas filas que el registro (cantidad y, si se conoce, huella)."""
+    if resumen is None or resumen["filas"] != estado_sync["filas"]:
+        return False
+    if resumen.get("huella") is None or estado_sync.get("huella") is None:
+        return True
+    return resumen["huella"] == estado_sync["huella"]
+
+def _restar_solape(marca):
+    """La marca menos SOLAPE_MARCA, en el mismo formato ISO UTC que escriben los backends."""
+    try:
+        instante = datetime.fromisoformat(marca)
+    except (TypeError, ValueError):
+        return marca
+    if instante.tzinfo is None:
+        instante = instante.replace(tzinfo=timezone.utc)
+    return (instante - SOLAPE_MARCA).astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+
+def _max_marca(marca_actual, filas):
+    """Mayor 'actualizado_en' entre la marca actual y las filas recibidas."""
+    marcas = [f["actualizado_en"] for f in filas if f.get("actualizado_en")]
+    if marca_actual is not None:
+        marcas.append(marca_actual)
+    return max(marcas) if marcas else None
@@ -1,48 +1,439 @@
+import copy
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
 import cv2
 import numpy as np
 
+from src.logical.analizadores import AnalizadorQuemadura, AnalizadorOscuridad, AnalizadorSaturacion
+from src.utils.cache import CacheLRU
+from src.utils.metricas import medir
+from src.utils.procesos import contexto_procesos
+
+# Extensiones que se analizan al recorrer una carpeta
+EXTENSIONES_IMAGEN = (".jpg", ".jpeg", ".png")
+
+# Resolución de análisis: las fotos más grandes se decodifican reducidas (1/2, 1/4 o 1/8).
+# En JPEG la reducción la hace el propio decodificador, sin armar nunca la imagen completa.
+MAX_PIXELES_ANALISIS = 4_000_000
+
+# Tope de memoria (MB) para decodificar: si la imagen reducida según MAX_PIXELES_ANALISIS
+# no entra, se reduce más (hasta 1/8) y el informe lo advierte; None = sin tope
+MEMORIA_MAX_MB = None
+
+# imdecode usa unos 2 bytes por píxel de salida (la imagen y un búfer del decodificador)
+BYTES_POR_PIXEL_DECODIFICADO = 2
+
+# Píxeles por franja al armar el histograma (calcHist cuenta en float32: exacto hasta 2^24)
+PIXELES_POR_FRANJA = 4_000_000
+
+# Versión de la decodificación + histograma: subirla invalida todos los resultados guardados
+VERSION_MOTOR = 3
+
+# Caché de resultados por contenido: LRU en memoria (compartida por el proceso)
+# y, si se configura una carpeta, una segunda capa en disco que sobrevive reinicios
+CACHE_MAX_ENTRADAS = 1024
+DIRECTORIO_CACHE = os.getenv("FIEE_VISION_CACHE_DIR") or None
+_CACHE_RESULTADOS = CacheLRU(CACHE_MAX_ENTRADAS)
+_HUELLAS_POR_ARCHIVO = CacheLRU(CACHE_MAX_ENTRADAS)  # file_id de Streamlit -> hash del contenido
+_HUELLAS_POR_RUTA = CacheLRU(CACHE_MAX_ENTRADAS)     # (ruta, mtime, tamaño) -> hash del contenido
+
+# Fotos encoladas por proceso en los lotes (como DOCUMENTOS_EN_VUELO en report_service)
+IMAGENES_EN_VUELO = 2
+
+_BANDERAS_REDUCCION = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
 class VisionService:
+    """
+    Motor de visión único (reemplaza a los dos VisionService anteriores).
+    Cada foto se decodifica UNA vez, se arma UN histograma de grises y de ahí
+    cada analizador (quemadura, oscuridad, saturación...) saca su métrica.
+    Agregar un chequeo es agregar un analizador: no hay otra pasada por los píxeles.
+    """
+
+    def __init__(self, analizadores=None, max_pixeles=MAX_PIXELES_ANALISIS, memoria_max_mb=MEMORIA_MAX_MB,
+                 usar_cache=True, directorio_cache=DIRECTORIO_CACHE):
+        self.analizadores = list(analizadores) if analizadores is not None else analizadores_por_defecto()
+        self.max_pixeles = max_pixeles
+        self.memoria_max_mb = memoria_max_mb  # Solo puede bajar la resolución, nunca subirla
+        self.usar_cache = usar_cache
+        self.directorio_cache = directorio_cache
+
+    def histograma(self, fuente):
+        """Histograma de grises (256 casillas) de una ruta, archivo o bytes. None si no es legible."""
+        return self._histograma(fuente)[0]
+
+    def _histograma(self, fuente):
+        """(histograma o None, reducción usada, si esa reducción la impuso el tope de memoria)."""
+        factor, por_tope = _factor_reduccion(fuente, self.max_pixeles, self.memoria_max_mb)
+        gray = _decodificar(fuente, factor)
+        if gray is None:
+            return None, factor, por_tope
+        return histograma_gris(gray), factor, por_tope
+
+    @medir("vision.inspeccionar")
+    def inspeccionar(self, fuente) -> dict:
+        """
+        Informe completo de la foto:
+        alerta / diagnostico / es_critico (solo los chequeos que afectan al equipo),
+        advertencias (calidad de la foto) y metricas (el resultado de cada analizador).
+        Si la misma foto ya se analizó con los mismos umbrales, se devuelve el resultado guardado.
+        """
+        clave = self._clave_de(fuente)
+        informe = self._leer_cache(clave)
+        if informe is None:
+            informe = self._inspeccionar(fuente)
+            self._guardar_cache(clave, informe)
+        return informe
+
+    @medir("vision.analisis_sin_cache")
+    def _inspeccionar(self, fuente) -> dict:
+        try:
+            histograma, factor, por_tope = self._histograma(fuente)
+        except Exception as e:
+            return _informe_error(f"Fallo IA: {str(e)}")
+        if histograma is None:
+            return _informe_error("Imagen no legible")
+
+        metricas = {analizador.nombre: analizador.evaluar(histograma) for analizador in self.analizadores}
+        del_equipo = [metricas[a.nombre] for a in self.analizadores if a.afecta_estado]
+        criticos = [m for m in del_equipo if m["critico"]]
+        principal = (criticos or del_equipo or [{"mensaje": "Sin chequeos del equipo."}])[0]
+        advertencias = [metricas[a.nombre]["mensaje"] for a in self.analizadores
+                        if not a.afecta_estado and metricas[a.nombre]["critico"]]
+        if por_tope:
+            advertencias.append(f"Analizada a 1/{factor} de resolución por el tope de memoria "
+                                f"({self.memoria_max_mb} MB): el resultado puede diferir")
+
+        return {
+            "alerta": "🚨 ALERTA CRÍTICA" if criticos else "✅ ESTADO NORMAL",
+            "diagnostico": principal["mensaje"],
+            "es_critico": bool(criticos),  # SEMÁFORO ROJO / VERDE
+            "advertencias": advertencias,
+            "metricas": metricas,
+        }
+
     def analizar_quemadura(self, image_path_or_buffer):
+        """Formato de siempre (alerta, diagnostico, es_critico), sacado de inspeccionar()."""
+        informe = self.inspeccionar(image_path_or_buffer)
+        return {clave: informe[clave] for clave in ("alerta", "diagnostico", "es_critico")}
+
+    # ------------------------------------------------------------------
+    # Caché de resultados (clave = contenido de la imagen + versión + umbrales)
+    # ------------------------------------------------------------------
+    def clave_cache(self, datos) -> str:
+        """Hash del contenido y de todo lo que cambia el resultado: otro umbral, otra clave."""
+        return self._clave(hashlib.sha256(datos).hexdigest())
+
+    def _clave(self, huella_contenido):
+        parametros = (VERSION_MOTOR, self.max_pixeles, self.memoria_max_mb,
+                      [analizador.firma() for analizador in self.analizadores])
+        return hashlib.sha256(f"{huella_contenido}|{parametros!r}".encode()).hexdigest()
+
+    def _clave_de(self, fuente):
+        if not self.usar_cache:
+            return None
+        try:
+            # Subidas de Streamlit: el mismo archivo vuelve en cada rerun con el mismo file_id,
+            # así no hace falta volver a calcular el hash de todos sus bytes
+            id_archivo = getattr(fuente, "file_id", None)
+            huella = _HUELLAS_POR_ARCHIVO.obtener(id_archivo) if id_archivo else None
+            if huella is None:
+                huella = hashlib.sha256(_bytes_sin_copia(fuente)).hexdigest()
+                if id_archivo:
+                    _HUELLAS_POR_ARCHIVO.guardar(id_archivo, huella)
+            return self._clave(huella)
+        except Exception:
+            return None  # Que el análisis informe el error
+
+    def _leer_cache(self, clave):
+        if clave is None:
+            return None
+        informe = _CACHE_RESULTADOS.obtener(clave)
+        if informe is None and self.directorio_cache:
+            try:
+                with open(self._ruta_cache(clave), encoding="utf-8") as f:
+                    informe = json.load(f)
+                _CACHE_RESULTADOS.guardar(clave, informe)
+            except (OSError, ValueError):
+                return None
+        # Copia: quien reciba el informe puede modificarlo sin tocar la caché
+        return copy.deepcopy(informe)
+
+    def _guardar_cache(self, clave, informe):
+        # Los errores no se guardan: pueden ser pasajeros
+        if clave is None or informe["alerta"] == "ERROR":
+            return
+        _CACHE_RESULTADOS.guardar(clave, copy.deepcopy(informe))
+        if self.directorio_cache:
+            ruta = self._ruta_cache(clave)
+            try:
+                os.makedirs(os.path.dirname(ruta), exist_ok=True)
+                temporal = f"{ruta}.{os.getpid()}.tmp"
+                with open(temporal, "w", encoding="utf-8") as f:
+                    json.dump(informe, f, ensure_ascii=False)
+                os.replace(temporal, ruta)  # Atómico: nadie lee un archivo a medio escribir
+            except OSError as e:
+                print(f"⚠️ No se pudo guardar en la caché de visión: {e}")
+
+    def _ruta_cache(self, clave):
+        return os.path.join(self.directorio_cache, clave[:2], f"{clave}.json")
+
+    # ------------------------------------------------------------------
+    # Análisis por lotes (rondas de inspección con cientos de fotos)
+    # ------------------------------------------------------------------
+    @medir("vision.analizar_lote")
+    def analizar_lote(self, fuentes, procesos=None):
         """
-        Versión V2.2: Con bandera booleana para evitar confusiones en el Dashboard.
+        Analiza muchas imágenes (rutas, archivos o bytes) en paralelo, una por proceso,
+        y devuelve los resultados en el mismo orden de 'fuentes'.
         """
+        fuentes = list(fuentes)
+        resultados = [None] * len(fuentes)
+        for indice, resultado in self.analizar_lote_stream(fuentes, procesos):
+            resultados[indice] = resultado
+        return resultados
+
+    def analizar_lote_stream(self, fuentes, procesos=None):
+        """
+        Igual que analizar_lote, pero produce (índice, resultado) a medida que
+        cada imagen termina, sin esperar a las demás. 'fuentes' puede ser un
+        generador: se recorre de a poco, a medida que se liberan procesos.
+        """
+        procesos = procesos or os.cpu_count() or 1
+        if hasattr(fuentes, "__len__"):
+            procesos = min(procesos, len(fuentes))
+        pool = None
+        en_vuelo = {}
         try:
-            # 1. Cargar la imagen (Tu lógica original)
-            if hasattr(image_path_or_buffer, 'read'): 
-                # Resetear el puntero del archivo por si acaso se leyó antes
-                image_path_or_buffer.seek(0)
-                file_bytes = np.asarray(bytearray(image_path_or_buffer.read()), dtype=np.uint8)
-                img = cv2.imdecode(file_bytes, 1)
-            else:
-                img = cv2.imread(image_path_or_buffer)
-
-            if img is None:
-                return {"alerta": "ERROR", "diagnostico": "Imagen no legible", "es_critico": False}
-
-            # 2. Procesamiento (Tu lógica original)
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            
-            # Umbral ajustado a 45 como pediste
-            umbral_oscuridad = 45 
-            
-            pixeles_totales = gray.size
-            pixeles_oscuros = np.count_nonzero(gray < umbral_oscuridad)
-            
-            porcentaje_quemado = (pixeles_oscuros / pixeles_totales) * 100
-
-            # 3. Decisión (AQUÍ ESTÁ LA CLAVE)
-            if porcentaje_quemado > 25.0:
-                return {
-                    "alerta": "🚨 ALERTA CRÍTICA",
-                    "diagnostico": f"Zona CARBONIZADA detectada ({porcentaje_quemado:.1f}%).",
-                    "es_critico": True  # <--- ESTO ES LO QUE NECESITAMOS (SEMÁFORO ROJO)
-                }
+            for indice, fuente in enumerate(fuentes):
+                # Los archivos abiertos no viajan entre procesos: mandamos sus bytes.
+                # Las rutas viajan tal cual y cada proceso lee (y hashea) su archivo.
+                # Las fotos ya analizadas salen de la caché sin pasar por el pool
+                trabajo = _a_transportable(fuente)
+                clave = self._clave_de_ruta(trabajo) if _es_ruta(trabajo) else self._clave_de(trabajo)
+                informe = self._leer_cache(clave)
+                if informe is not None:
+                    yield indice, informe
+                    continue
+                if procesos <= 1:
+                    yield indice, self._recibir(trabajo, clave, _analizar(self, trabajo))
+                    continue
+
+                if pool is None:
+                    # Recién con la primera foto sin caché: un lote ya analizado no arranca procesos
+                    pool = ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso,
+                                               mp_context=contexto_procesos())
+                en_vuelo[pool.submit(_analizar, self, trabajo)] = (indice, trabajo, clave)
+                # Ventana acotada: no se encolan todas las fotos (ni sus bytes) de una vez
+                if len(en_vuelo) >= procesos * IMAGENES_EN_VUELO:
+                    listos, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                    for futuro in listos:
+                        indice_listo, trabajo_listo, clave_lista = en_vuelo.pop(futuro)
+                        yield indice_listo, self._recibir(trabajo_listo, clave_lista, futuro.result())
+
+            for futuro in as_completed(list(en_vuelo)):
+                indice_listo, trabajo_listo, clave_lista = en_vuelo.pop(futuro)
+                yield indice_listo, self._recibir(trabajo_listo, clave_lista, futuro.result())
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    def _clave_de_ruta(self, ruta):
+        """Clave de caché de una ruta ya hasheada antes (mismo tamaño y fecha), sin leerla; si no, None."""
+        if not self.usar_cache:
+            return None
+        try:
+            datos = os.stat(ruta)
+        except OSError:
+            return None
+        huella = _HUELLAS_POR_RUTA.obtener((os.path.abspath(ruta), datos.st_mtime_ns, datos.st_size))
+        return self._clave(huella) if huella is not None else None
+
+    def _recibir(self, trabajo, clave, resultado):
+        """Guarda en la caché lo que devolvió _analizar (las rutas llegan con su huella)."""
+        huella, informe = resultado
+        if clave is None and huella is not None:
+            try:
+                datos = os.stat(trabajo)
+                _HUELLAS_POR_RUTA.guardar((os.path.abspath(trabajo), datos.st_mtime_ns, datos.st_size), huella)
+            except OSError:
+                pass
+            clave = self._clave(huella)
+        self._guardar_cache(clave, informe)
+        return informe
+
+    def analizar_carpeta(self, carpeta, procesos=None):
+        """[(ruta, resultado)] de todas las fotos de la carpeta, ordenadas por nombre."""
+        rutas = sorted(
+            os.path.join(carpeta, nombre) for nombre in os.listdir(carpeta)
+            if nombre.lower().endswith(EXTENSIONES_IMAGEN)
+        )
+        return list(zip(rutas, self.analizar_lote(rutas, procesos)))
+
+
+class ImagenFueraDeTope(ValueError):
+    """La imagen no se puede decodificar sin pasar el tope de memoria configurado."""
+
+
+def decodificar_gris(fuente, max_pixeles=MAX_PIXELES_ANALISIS, memoria_max_mb=None):
+    """
+    Decodifica la imagen directo a escala de grises, reducida si supera 'max_pixeles'
+    (o si a esa resolución no entra en 'memoria_max_mb').
+    Los bytes se leen sin copiarlos (getbuffer / frombuffer). None si no es legible.
+    """
+    return _decodificar(fuente, _factor_reduccion(fuente, max_pixeles, memoria_max_mb)[0])
+
+def _decodificar(fuente, factor):
+    datos = _bytes_sin_copia(fuente)
+    if datos.size == 0:
+        return None
+    return cv2.imdecode(datos, _BANDERAS_REDUCCION[factor])
+
+def histograma_gris(gray):
+    """Histograma de 256 casillas en una sola pasada, por franjas de filas."""
+    pixeles = PIXELES_POR_FRANJA
+    filas = max(1, pixeles // gray.shape[1])
+    histograma = np.zeros(256, dtype=np.int64)
+    for i in range(0, gray.shape[0], filas):
+        histograma += cv2.calcHist([gray[i:i + filas]], [0], None, [256], [0, 256]).ravel().astype(np.int64)
+    return histograma
+
+def analizadores_por_defecto():
+    return [AnalizadorQuemadura(), AnalizadorOscuridad(), AnalizadorSaturacion()]
+
+def _informe_error(diagnostico):
+    return {"alerta": "ERROR", "diagnostico": diagnostico, "es_critico": False, "advertencias": [], "metricas": {}}
+
+def _bytes_sin_copia(fuente):
+    if isinstance(fuente, (bytes, bytearray, memoryview)):
+        return np.frombuffer(fuente, dtype=np.uint8)
+    if hasattr(fuente, 'getbuffer'):
+        # BytesIO / UploadedFile de Streamlit: vista directa sobre su memoria
+        return np.frombuffer(fuente.getbuffer(), dtype=np.uint8)
+    if hasattr(fuente, 'read'):
+        fuente.seek(0)
+        return np.frombuffer(fuente.read(), dtype=np.uint8)
+    return np.fromfile(fuente, dtype=np.uint8)
+
+def _cabecera(fuente):
+    """
+    (ancho, alto, bytes_fijos_por_pixel) leyendo solo la cabecera (PIL no decodifica
+    hasta que se piden los píxeles). bytes_fijos_por_pixel es lo que el decodificador
+    ocupa por píxel de la imagen COMPLETA aunque se pida reducida (medido con OpenCV):
+      - JPEG secuencial: 0, libjpeg reduce mientras decodifica.
+      - JPEG progresivo: guarda todos los coeficientes (2 bytes por muestra).
+      - PNG: arma el plano gris completo (1 byte) y recién después reduce.
+      - Otros formatos: la imagen completa con todos sus canales.
+    None si PIL no la reconoce.
+    """
+    try:
+        from PIL import Image
+        if isinstance(fuente, (bytes, bytearray, memoryview)):
+            fuente = io.BytesIO(fuente)
+        elif hasattr(fuente, 'seek'):
+            fuente.seek(0)
+        with Image.open(fuente) as img:
+            if img.format == "JPEG":
+                if not img.info.get("progressive"):
+                    fijos = 0
+                else:
+                    # Muestras por píxel según el submuestreo de cada componente (4:2:0 -> 1.5)
+                    h_max = max(h for _, h, _, _ in img.layer)
+                    v_max = max(v for _, _, v, _ in img.layer)
+                    fijos = 2 * sum(h * v for _, h, v, _ in img.layer) / (h_max * v_max)
+            elif img.format == "PNG":
+                fijos = 1
             else:
-                return {
-                    "alerta": "✅ ESTADO NORMAL",
-                    "diagnostico": f"Superficie limpia ({porcentaje_quemado:.1f}% oscuridad).",
-                    "es_critico": False # <--- ESTO ES LO QUE NECESITAMOS (SEMÁFORO VERDE)
-                }
+                fijos = len(img.getbands())
+            return (*img.size, fijos)
+    except Exception:
+        return None
 
-        except Exception as e:
-            return {"alerta": "ERROR", "diagnostico": f"Fallo IA: {str(e)}", "es_critico": False}
+def _factor_reduccion(fuente, max_pixeles, memoria_max_mb=None):
+    """
+    (factor, por_tope): menor reducción (1, 2, 4 u 8) con la que la imagen queda dentro
+    de max_pixeles y, si hay tope, cuya decodificación entra en memoria_max_mb.
+    por_tope indica que el tope obligó a reducir más de lo que pedía max_pixeles:
+    el tope solo puede bajar la resolución de análisis, nunca subirla.
+    Más allá de 1/8 no se reduce; si ni así entra, lanza ImagenFueraDeTope.
+    """
+    cabecera = _cabecera(fuente)
+    if cabecera is None:
+        return 1, False  # Formato que PIL no reconoce: que lo intente OpenCV a tamaño completo
+    ancho, alto, fijos = cabecera
+
+    def pixeles(factor):
+        return -(-ancho // factor) * -(-alto // factor)
+
+    factor = 8
+    for candidato in (1, 2, 4, 8):
+        if not max_pixeles or pixeles(candidato) <= max_pixeles:
+            factor = candidato
+            break
+    if not memoria_max_mb:
+        return factor, False
+
+    tope = memoria_max_mb * 1024 * 1024
+    for candidato in (1, 2, 4, 8):
+        if candidato >= factor and ancho * alto * fijos + pixeles(candidato) * BYTES_POR_PIXEL_DECODIFICADO <= tope:
+            return candidato, candidato != factor
+    necesarios = (ancho * alto * fijos + pixeles(8) * BYTES_POR_PIXEL_DECODIFICADO) / (1024 * 1024)
+    raise ImagenFueraDeTope(f"La imagen de {ancho}x{alto} necesita {necesarios:.1f} MB para decodificarse "
+                            f"(tope: {memoria_max_mb} MB)")
+
+def _a_transportable(fuente):
+    if hasattr(fuente, 'read'):
+        fuente.seek(0)
+        return fuente.read()
+    return fuente
+
+def _iniciar_proceso():
+    # Un hilo de OpenCV por proceso: el paralelismo ya lo da el pool
+    cv2.setNumThreads(1)
+
+def _es_ruta(fuente):
+    return isinstance(fuente, (str, os.PathLike))
+
+def _analizar(servicio, trabajo):
+    """
+    (huella del contenido o None, informe). Corre en los procesos del lote.
+    Una ruta se lee una sola vez y se hashea aquí, no en el proceso principal;
+    si la carpeta de caché ya tiene el resultado, no se vuelve a analizar.
+    Guardar en la caché queda a cargo del proceso principal.
+    """
+    if not _es_ruta(trabajo) or not servicio.usar_cache:
+        return None, servicio._inspeccionar(trabajo)
+    try:
+        with open(trabajo, "rb") as f:
+            datos = f.read()
+    except OSError as e:
+        return None, _informe_error(f"Fallo IA: {str(e)}")
+    huella = hashlib.sha256(datos).hexdigest()
+    informe = servicio._leer_cache(servicio._clave(huella))
+    return huella, informe if informe is not None else servicio._inspeccionar(datos)
+
+
+if __name__ == "__main__":
+    # Uso: python -m src.services.vision_service <carpeta> [--procesos N]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Análisis de quemaduras de todas las fotos de una carpeta")
+    parser.add_argument("carpeta")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos en paralelo (por defecto, uno por núcleo)")
+    args = parser.parse_args()
+
+    resultados = VisionService().analizar_carpeta(args.carpeta, args.procesos)
+    for ruta, resultado in resultados:
+        advertencias = " | ".join(resultado["advertencias"])
+        print(f"{os.path.basename(ruta)}\t{resultado['alerta']}\t{resultado['diagnostico']}\t{advertencias}")
+    criticos = sum(1 for _, resultado in resultados if resultado["es_critico"])
+    print(f"🔎 Fotos analizadas: {len(resultados)} | 🚨 Críticas: {criticos}")
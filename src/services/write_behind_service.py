@@ -0,0 +1,235 @@
+import atexit
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from src.repositories.equipo_repository import EquipoRepository
+from src.utils.mapper import map_object_to_cambios
+
+
+# Prefijo de las claves de la cola que corresponden a tickets (y no a equipos)
+TICKET = "incidencia"
+
+
+def _es_ticket(clave):
+    return type(clave) is tuple and clave[0] == TICKET
+
+
+class WriteBehindService:
+    """
+    Cola de persistencia "write-behind".
+    La vista modifica el objeto en memoria y lo encola; un hilo en segundo plano
+    lo guarda en Supabase en lotes. Al encolar se copian solo las columnas que la
+    app cambia (estado y estrategia), así el hilo nunca lee objetos que las vistas
+    siguen modificando y el update no pisa el resto de la fila.
+    Si el mismo id_activo se encola varias veces antes de guardarse, solo se envía
+    su última versión.
+    Los tickets nuevos se encolan aparte y nunca se fusionan: cada uno es un
+    insert en la tabla de incidencias.
+    Lo que no se pudo guardar tras todos los reintentos (o sin conexión) no se
+    descarta: queda en fallidos() hasta que alguien lo reintente.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, repo=None, tam_lote=100, espera_lote=0.2, max_reintentos=5, espera_base=0.5):
+        self.repo = repo
+        self.tam_lote = tam_lote
+        self.espera_lote = espera_lote          # Segundos que esperamos para juntar más cambios
+        self.max_reintentos = max_reintentos
+        self.espera_base = espera_base          # Backoff: espera_base * 2^(intento-1)
+
+        # id_activo -> [fila parcial, intentos, listo_en]
+        # (TICKET, n) -> [(id_activo, ticket), intentos, listo_en]
+        self._pendientes = OrderedDict()
+        # Misma clave -> {"dato", "error", "fecha"}: lo que agotó los reintentos
+        self._fallidos = OrderedDict()
+        self._numerador = itertools.count()
+        self._en_vuelo = 0
+        self._cond = threading.Condition()
+        self._detenido = False
+        self._hilo = None
+
+    @classmethod
+    def instancia(cls):
+        """Cola compartida por todo el proceso (todas las sesiones de Streamlit)."""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+                    atexit.register(cls._instance.detener)
+        return cls._instance
+
+    def encolar(self, equipo):
+        """Programa el guardado del estado y la estrategia del equipo. Vuelve de inmediato."""
+        # Se serializa aquí, en el hilo de quien llama: el hilo de fondo solo ve esta copia
+        fila = map_object_to_cambios(equipo)
+        with self._cond:
+            if self._detenido:
+                raise RuntimeError("La cola de persistencia está detenida")
+            # Una versión más nueva reemplaza también a la que había fallado
+            self._fallidos.pop(fila["id_activo"], None)
+            entrada = self._pendientes.get(fila["id_activo"])
+            if entrada is None:
+                # Se envía tras una pequeña ventana, para juntar más cambios en el mismo lote
+                self._pendientes[fila["id_activo"]] = [fila, 0, time.monotonic() + self.espera_lote]
+            else:
+                # Coalescencia: reemplazamos la versión pendiente sin perder su turno
+                entrada[0], entrada[1] = fila, 0
+            self._asegurar_hilo()
+            self._cond.notify_all()
+
+    def encolar_incidencia(self, id_activo, ticket):
+        """Programa el insert de un ticket nuevo (lo que devuelve Equipo.registrar_incidencia)."""
+        with self._cond:
+            if self._detenido:
+                raise RuntimeError("La cola de persistencia está detenida")
+            clave = (TICKET, next(self._numerador))
+            self._pendientes[clave] = [(id_activo, ticket), 0, time.monotonic() + self.espera_lote]
+            self._asegurar_hilo()
+            self._cond.notify_all()
+
+    def pendientes(self) -> int:
+        """Cambios que todavía se están guardando (no incluye los fallidos)."""
+        with self._cond:
+            return len(self._pendientes) + self._en_vuelo
+
+    def fallidos(self) -> list:
+        """
+        Cambios que no se pudieron guardar, del más antiguo al más nuevo:
+        [{"id_activo", "tipo" ("equipo" o "incidencia"), "error", "fecha"}].
+        """
+        with self._cond:
+            return [
+                {"id_activo": entrada["dato"][0] if _es_ticket(clave) else clave,
+                 "tipo": TICKET if _es_ticket(clave) else "equipo",
+                 "error": entrada["error"], "fecha": entrada["fecha"]}
+                for clave, entrada in self._fallidos.items()
+            ]
+
+    def reintentar_fallidos(self) -> int:
+        """Vuelve a encolar todo lo fallido (con los reintentos a cero). Devuelve cuántos."""
+        with self._cond:
+            if self._detenido:
+                raise RuntimeError("La cola de persistencia está detenida")
+            cantidad = len(self._fallidos)
+            while self._fallidos:
+                clave, entrada = self._fallidos.popitem(last=False)
+                if clave not in self._pendientes:
+                    self._pendientes[clave] = [entrada["dato"], 0, 0.0]
+            if cantidad:
+                self._asegurar_hilo()
+                self._cond.notify_all()
+            return cantidad
+
+    def flush(self, timeout=None) -> bool:
+        """
+        Espera a que se guarde todo lo encolado (incluidos los reintentos).
+        Devuelve False si se agotó el tiempo.
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            # Lo pendiente se manda ya, sin esperar a juntar más cambios
+            for entrada in self._pendientes.values():
+                entrada[2] = 0.0
+            self._cond.notify_all()
+            while self._pendientes or self._en_vuelo:
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return False
+                self._cond.wait(restante)
+            return True
+
+    def detener(self, timeout=10.0) -> bool:
+        """Vacía la cola y detiene el hilo (al apagar el servidor o en pruebas)."""
+        vaciada = self.flush(timeout)
+        with self._cond:
+            self._detenido = True
+            self._cond.notify_all()
+            hilo = self._hilo
+            fallidos = len(self._fallidos)
+        if hilo is not None:
+            hilo.join(timeout)
+        if fallidos:
+            print(f"❌ Se apaga la cola con {fallidos} cambios sin guardar")
+        return vaciada
+
+    # ------------------------------------------------------------------
+    # Hilo de fondo
+    # ------------------------------------------------------------------
+    def _asegurar_hilo(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._hilo = threading.Thread(target=self._trabajar, name="write-behind", daemon=True)
+            self._hilo.start()
+
+    def _trabajar(self):
+        while True:
+            lote = self._tomar_lote()
+            if lote is None:
+                return
+            try:
+                self._persistir(lote)
+            finally:
+                with self._cond:
+                    self._en_vuelo -= len(lote)
+                    self._cond.notify_all()
+
+    def _tomar_lote(self):
+        with self._cond:
+            while True:
+                if self._detenido and not self._pendientes:
+                    return None
+                ahora = time.monotonic()
+                listos = [id_activo for id_activo, (_, _, listo_en) in self._pendientes.items() if listo_en <= ahora]
+                if listos:
+                    lote = [(id_activo, self._pendientes.pop(id_activo)) for id_activo in listos[:self.tam_lote]]
+                    self._en_vuelo += len(lote)
+                    return lote
+                proximo = min((listo_en for _, _, listo_en in self._pendientes.values()), default=None)
+                self._cond.wait(None if proximo is None else max(0.0, proximo - ahora))
+
+    def _persistir(self, lote):
+        repo = self.repo if self.repo is not None else EquipoRepository()
+        if not repo.backend:
+            # Reintentar no arregla la falta de conexión: va directo a fallidos
+            print(f"⚠️ Sin conexión: {len(lote)} cambios quedan sin guardar")
+            with self._cond:
+                for clave, (dato, _, _) in lote:
+                    self._a_fallidos(clave, dato, "Sin conexión a la base de datos")
+                self._cond.notify_all()
+            return
+
+        filas = [fila for clave, (fila, _, _) in lote if not _es_ticket(clave)]
+        errores = {}
+        if filas:
+            try:
+                errores.update(repo.actualizar_campos(filas, tam_lote=self.tam_lote)["errores"])
+            except Exception as e:
+                errores.update((fila["id_activo"], str(e)) for fila in filas)
+        for clave, (dato, _, _) in lote:
+            if _es_ticket(clave) and not repo.registrar_incidencia(*dato):
+                errores[clave] = f"No se pudo registrar el ticket de {dato[0]}"
+
+        with self._cond:
+            for clave, (dato, intentos, _) in lote:
+                if clave not in errores:
+                    continue
+                if clave in self._pendientes:
+                    continue  # Ya hay una versión más nueva en la cola; esa se encargará
+                intentos += 1
+                if intentos > self.max_reintentos:
+                    print(f"❌ {clave} queda sin guardar tras {self.max_reintentos} reintentos: {errores[clave]}")
+                    self._a_fallidos(clave, dato, errores[clave])
+                    continue
+                espera = min(self.espera_base * 2 ** (intentos - 1), 30.0)
+                self._pendientes[clave] = [dato, intentos, time.monotonic() + espera]
+            self._cond.notify_all()
+
+    def _a_fallidos(self, clave, dato, error):
+        # Se llama con self._cond tomado
+        if clave in self._pendientes:
+            return  # Una versión más nueva ya está en la cola
+        self._fallidos[clave] = {"dato": dato, "error": error,
+                                 "fecha": datetime.now().isoformat(timespec="seconds")}
@@ -1,41 +1,162 @@
+import sys
+from itertools import chain
+
 from src.equipo_factory import EquipoFactory
+from src.models.incidencia import Incidencia, severidad_de
 from src.utils.enums import EstadoEquipo
+from src.utils.metricas import medir
 
 
-def map_json_to_object(data_list, estrategia_lineal, estrategia_exponencial):
+def map_item_to_object(item, estrategia_lineal, estrategia_exponencial, cargador_historial=None):
+    """
+    Convierte UNA fila de Supabase en su objeto. Devuelve None si no se pudo mapear.
+    Si la fila no trae el historial, el equipo lo leerá con 'cargador_historial'
+    la primera vez que se consulte.
+    """
+    tipo = item.get("tipo_equipo")
+    detalles = item.get("detalles_tecnicos", {})
+
+    # Selección de estrategia
+    nombre_est = item.get("estrategia_nombre", "Lineal")
+    est_obj = estrategia_lineal if "Lineal" in nombre_est else estrategia_exponencial
+
+    try:
+        nuevo_obj = EquipoFactory.crear_equipo(
+            tipo,
+            item,
+            detalles,
+            est_obj
+        )
+
+        # Datos comunes a todos los equipos.
+        # Laboratorio y modelo se repiten miles de veces: los internamos para que
+        # todos los equipos compartan el mismo texto en memoria
+        nuevo_obj.ubicacion = _internar(item.get("ubicacion", "Sin Asignar"))
+        nuevo_obj.modelo = _internar(nuevo_obj.modelo)
+        nuevo_obj.fecha_compra = _internar(nuevo_obj.fecha_compra)
+
+        estado_str = item.get("estado", "OPERATIVO")
+        if hasattr(EstadoEquipo, estado_str):
+            nuevo_obj.estado = getattr(EstadoEquipo, estado_str)
+
+        if "historial_incidencias" in item:
+            nuevo_obj.historial_incidencias = item["historial_incidencias"] or []
+        else:
+            nuevo_obj.diferir_historial(cargador_historial, item.get("total_incidencias") or 0,
+                                        item.get("ultima_severidad"))
+
+        return nuevo_obj
+
+    except Exception as e:
+        print(f"Error mapeando objeto {item.get('id_activo')}: {e}")
+        return None
+
+
+def _internar(texto):
+    return sys.intern(texto) if type(texto) is str else texto
+
+
+@medir("mapper.map_json_to_object")
+def map_json_to_object(data_list, estrategia_lineal, estrategia_exponencial, cargador_historial=None):
     """
     Convierte los datos JSON de Supabase en objetos del sistema.
     """
     objetos_convertidos = []
 
     for item in data_list:
-        tipo = item.get("tipo_equipo")
-        detalles = item.get("detalles_tecnicos", {})
+        nuevo_obj = map_item_to_object(item, estrategia_lineal, estrategia_exponencial, cargador_historial)
+        if nuevo_obj is not None:
+            objetos_convertidos.append(nuevo_obj)
 
-        # Selección de estrategia
-        nombre_est = item.get("estrategia_nombre", "Lineal")
-        est_obj = estrategia_lineal if "Lineal" in nombre_est else estrategia_exponencial
+    return objetos_convertidos
 
-        try:
-            nuevo_obj = EquipoFactory.crear_equipo(
-                tipo,
-                item,
-                detalles,
-                est_obj
-            )
 
-            # Datos comunes a todos los equipos
-            nuevo_obj.ubicacion = item.get("ubicacion", "Sin Asignar")
+# Atributos técnicos que se guardan en la columna JSONB 'detalles_tecnicos'
+CAMPOS_TECNICOS = ("hp", "voltaje", "rpm", "ancho_banda", "precision")
 
-            estado_str = item.get("estado", "OPERATIVO")
-            if hasattr(EstadoEquipo, estado_str):
-                nuevo_obj.estado = getattr(EstadoEquipo, estado_str)
 
-            nuevo_obj.historial_incidencias = item.get("historial_incidencias", [])
+def map_object_to_json(equipo):
+    """
+    Operación inversa: convierte un equipo en la fila que espera la tabla 'equipos'.
+    La usan tanto el guardado individual como el masivo del repositorio.
+    """
+    # Extraemos solo los atributos específicos que tenga este tipo de equipo
+    detalles = {campo: getattr(equipo, campo) for campo in CAMPOS_TECNICOS if hasattr(equipo, campo)}
 
-            objetos_convertidos.append(nuevo_obj)
+    return {
+        "id_activo": equipo.id_activo,
+        "modelo": equipo.modelo,
+        "tipo_equipo": type(equipo).__name__,
+        "fecha_compra": str(equipo.fecha_compra),
+        # Si el objeto no tiene el atributo, por defecto usa 'Sin Ubicación'
+        "ubicacion": getattr(equipo, 'ubicacion', 'Sin Ubicación'),
+        "estado": equipo.estado.name,
+        "estrategia_nombre": nombre_estrategia(equipo.estrategia_desgaste),
+        "detalles_tecnicos": detalles,
+        # El historial NO va en la fila: cada ticket se agrega a la tabla 'incidencias'
+    }
+
+
+def map_object_to_cambios(equipo):
+    """
+    Solo las columnas que la app modifica en un equipo existente (estado y estrategia).
+    Al guardarlas con un update no se pisa ninguna otra columna de la fila.
+    """
+    return {
+        "id_activo": equipo.id_activo,
+        "estado": equipo.estado.name,
+        "estrategia_nombre": nombre_estrategia(equipo.estrategia_desgaste),
+    }
+
+
+# Campos del ticket que tienen columna propia en la tabla 'incidencias'
+CAMPOS_TICKET = ("fecha", "detalle", "dictamen_ia")
+
+
+def map_ticket_to_json(id_activo, ticket):
+    """Convierte un ticket del historial en una fila de la tabla 'incidencias'."""
+    ticket = Incidencia.desde(ticket)
+    # Los tickets anteriores al uuid (o los de datos de ejemplo) van con NULL: no chocan entre sí
+    fila = {"uuid": ticket.get("uuid"), "id_activo": id_activo, "severidad": severidad_de(ticket)}
+    fila.update((campo, ticket.get(campo)) for campo in CAMPOS_TICKET)
+    # Campos poco comunes (p. ej. 'reportado_por') van en la columna JSON 'datos'
+    fila["datos"] = {clave: valor for clave, valor in ticket.items() if clave not in CAMPOS_TICKET + ("uuid",)}
+    return fila
+
+
+def map_json_to_ticket(fila):
+    """Operación inversa: fila de 'incidencias' -> ticket como lo usa el historial."""
+    ticket = {campo: fila[campo] for campo in CAMPOS_TICKET if fila.get(campo) is not None}
+    ticket.update(fila.get("datos") or {})
+    return ticket
+
+
+def nombre_estrategia(estrategia):
+    return "DesgasteLineal" if "Lineal" in str(type(estrategia)) else "DesgasteExponencial"
+
+
+def map_json_to_object_stream(paginas, estrategia_lineal, estrategia_exponencial, cargador_historial=None):
+    """
+    Versión en streaming de map_json_to_object.
+    Recibe las páginas que entrega EquipoRepository.leer_paginado() y produce
+    cada objeto apenas se construye, sin armar listas intermedias.
+    """
+    for item in chain.from_iterable(paginas):
+        nuevo_obj = map_item_to_object(item, estrategia_lineal, estrategia_exponencial, cargador_historial)
+        if nuevo_obj is not None:
+            yield nuevo_obj
+
+
+def agrupar_por_ubicacion(equipos, laboratorios_dict=None, ubicacion_defecto="Laboratorio FIEE"):
+    """
+    Agrupa los equipos por laboratorio a medida que van llegando.
+    Si se pasa 'laboratorios_dict' se completa ese mismo diccionario.
+    """
+    if laboratorios_dict is None:
+        laboratorios_dict = {}
 
-        except Exception as e:
-            print(f"Error mapeando objeto {item.get('id_activo')}: {e}")
+    for equipo in equipos:
+        ubicacion = getattr(equipo, 'ubicacion', ubicacion_defecto)
+        laboratorios_dict.setdefault(ubicacion, []).append(equipo)
 
-    return objetos_convertidos
\ No newline at end of file
+    return laboratorios_dict
@@ -0,0 +1,169 @@
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime
+
+# Desactivada por defecto: las funciones medidas solo pagan un if
+_activo = os.getenv("FIEE_METRICAS", "0").strip().lower() in ("1", "true", "si", "sí")
+# Operaciones más lentas que esto quedan en el registro de lentas (y se imprimen)
+UMBRAL_LENTO_MS = float(os.getenv("FIEE_UMBRAL_LENTO_MS", "500"))
+MAX_LENTAS = 200
+
+# Límites superiores de los tramos del histograma, en milisegundos
+TRAMOS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+_SIN_MEDIR = nullcontext()
+
+
+class _Serie:
+    __slots__ = ("cuenta", "total", "maximo", "tramos")
+
+    def __init__(self):
+        self.cuenta = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.tramos = [0] * len(TRAMOS_MS)
+
+    def agregar(self, ms):
+        self.cuenta += 1
+        self.total += ms
+        if ms > self.maximo:
+            self.maximo = ms
+        for i, limite in enumerate(TRAMOS_MS):
+            if ms <= limite:
+                self.tramos[i] += 1
+                break
+
+    def percentil(self, p):
+        """Cota superior del percentil p (el límite del tramo donde cae)."""
+        objetivo = self.cuenta * p
+        acumulado = 0
+        for limite, cantidad in zip(TRAMOS_MS, self.tramos):
+            acumulado += cantidad
+            if acumulado >= objetivo:
+                return min(limite, self.maximo)
+        return self.maximo
+
+
+class RegistroMetricas:
+    """
+    Histogramas de latencia y cuentas por operación, en memoria del proceso
+    (compartidos por todas las sesiones de Streamlit), más un registro de las
+    operaciones que superaron el umbral de lentitud.
+    """
+
+    def __init__(self, umbral_lento_ms=UMBRAL_LENTO_MS):
+        self.umbral_lento_ms = umbral_lento_ms
+        self._series = {}
+        self._lentas = deque(maxlen=MAX_LENTAS)
+        self._lock = threading.Lock()
+
+    def registrar(self, nombre, segundos):
+        ms = segundos * 1000
+        with self._lock:
+            serie = self._series.get(nombre)
+            if serie is None:
+                serie = self._series[nombre] = _Serie()
+            serie.agregar(ms)
+            lenta = ms >= self.umbral_lento_ms
+            if lenta:
+                self._lentas.append({"fecha": datetime.now().isoformat(timespec="seconds"),
+                                     "operacion": nombre, "ms": round(ms, 1)})
+        if lenta:
+            print(f"🐢 Operación lenta: {nombre} tardó {ms:.0f} ms")
+
+    def instantanea(self):
+        """[{operacion, cuenta, total_ms, promedio_ms, p50_ms, p95_ms, max_ms}], de la más costosa a la menos."""
+        with self._lock:
+            filas = [
+                {
+                    "operacion": nombre,
+                    "cuenta": serie.cuenta,
+                    "total_ms": round(serie.total, 1),
+                    "promedio_ms": round(serie.total / serie.cuenta, 3),
+                    "p50_ms": round(serie.percentil(0.50), 3),
+                    "p95_ms": round(serie.percentil(0.95), 3),
+                    "max_ms": round(serie.maximo, 3),
+                }
+                for nombre, serie in self._series.items()
+            ]
+        return sorted(filas, key=lambda fila: fila["total_ms"], reverse=True)
+
+    def lentas(self):
+        """Operaciones sobre el umbral, de la más reciente a la más antigua."""
+        with self._lock:
+            return list(reversed(self._lentas))
+
+    def a_prometheus(self):
+        """Histogramas en formato de texto de Prometheus (segundos, tramos acumulados)."""
+        lineas = [
+            "# HELP fiee_operacion_segundos Duración de las operaciones instrumentadas",
+            "# TYPE fiee_operacion_segundos histogram",
+        ]
+        with self._lock:
+            for nombre, serie in sorted(self._series.items()):
+                etiqueta = nombre.replace("\\", "\\\\").replace('"', '\\"')
+                acumulado = 0
+                for limite, cantidad in zip(TRAMOS_MS, serie.tramos):
+                    acumulado += cantidad
+                    le = "+Inf" if limite == float("inf") else repr(limite / 1000)
+                    lineas.append(f'fiee_operacion_segundos_bucket{{operacion="{etiqueta}",le="{le}"}} {acumulado}')
+                lineas.append(f'fiee_operacion_segundos_sum{{operacion="{etiqueta}"}} {serie.total / 1000!r}')
+                lineas.append(f'fiee_operacion_segundos_count{{operacion="{etiqueta}"}} {serie.cuenta}')
+        return "\n".join(lineas) + "\n"
+
+    def reiniciar(self):
+        with self._lock:
+            self._series.clear()
+            self._lentas.clear()
+
+
+# Registro único del proceso
+METRICAS = RegistroMetricas()
+
+
+def activar(encendido=True):
+    global _activo
+    _activo = bool(encendido)
+
+def activo() -> bool:
+    return _activo
+
+
+class _Cronometro:
+    __slots__ = ("nombre", "inicio")
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        METRICAS.registrar(self.nombre, time.perf_counter() - self.inicio)
+        return False
+
+
+def tramo(nombre):
+    """Context manager que mide el bloque: `with tramo("vista.inventario"): ...`."""
+    return _Cronometro(nombre) if _activo else _SIN_MEDIR
+
+
+def medir(nombre):
+    """Decorador que mide cada llamada a la función bajo 'nombre'. Desactivado, solo cuesta un if."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _activo:
+                return funcion(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                METRICAS.registrar(nombre, time.perf_counter() - inicio)
+        return envoltura
+    return decorador
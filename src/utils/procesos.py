@@ -0,0 +1,13 @@
+import multiprocessing
+
+
+def contexto_procesos():
+    """
+    Contexto para los pools de procesos. Se usan desde el servidor de Streamlit,
+    que tiene varios hilos (tornado, la cola write-behind, la reconciliación):
+    con 'fork' un hijo puede heredar un lock tomado por otro hilo y quedar colgado.
+    'forkserver' arranca cada hijo desde un proceso limpio; donde no existe (Windows)
+    se usa 'spawn'.
+    """
+    metodo = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(metodo)
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
 import streamlit as st
+from src.services.sync_service import SyncService
+from src.services.write_behind_service import WriteBehindService
 
 class Vista(ABC):
     """
@@ -10,4 +12,31 @@ class Vista(ABC):
     @abstractmethod
     def render(self):
         """Método abstracto que las hijas deben obligatoriamente implementar."""
-        pass
\ No newline at end of file
+        pass
+
+    def avisar_carga_incompleta(self):
+        """Aviso (con botón para reintentar) si la descarga de la flota se cortó a mitad."""
+        if not SyncService.carga_incompleta(st.session_state.get('estado_sync')):
+            return
+        st.warning(f"⚠️ La descarga del inventario se interrumpió: se muestran solo "
+                   f"{st.session_state.estado_sync['filas']} equipos.")
+        if st.button("🔄 Reintentar descarga", key="reintentar_carga"):
+            # Sin registro, app.py y las vistas vuelven a cargar la flota en este rerun
+            del st.session_state['db_laboratorios']
+            st.rerun()
+
+    def avisar_cambios_sin_guardar(self):
+        """Aviso (con botón de reintento) si la cola en segundo plano no pudo guardar algo."""
+        cola = WriteBehindService.instancia()
+        fallidos = cola.fallidos()
+        if not fallidos:
+            return
+        with st.container(border=True):
+            st.error(f"❌ {len(fallidos)} cambios NO se guardaron en la base de datos "
+                     "(por ahora solo están en la memoria del servidor).")
+            with st.expander("Ver detalle"):
+                for f in fallidos:
+                    st.caption(f"{f['fecha']} | {f['tipo']} {f['id_activo']}: {f['error']}")
+            if st.button("🔁 Reintentar guardado", key="reintentar_fallidos"):
+                cola.reintentar_fallidos()
+                st.rerun()
@@ -1,28 +1,40 @@
+import glob
+import os
+import tempfile
+import time
 import streamlit as st
+import numpy as np
 import pandas as pd
 import random
-import time
 from datetime import datetime
-from fpdf import FPDF
+from functools import partial
 
 # --- IMPORTS PROPIOS ---
 from src.views.base_view import Vista 
 from src.models.equipo import Equipo 
 from src.models.concretos import MotorInduccion, Osciloscopio, Multimetro
+from src.models.flota import RegistroFlota
 from src.logical.estrategias import DesgasteLineal, DesgasteExponencial
+from src.logical.obsolescencia import calcular_obsolescencia_flota
 from src.repositories.equipo_repository import EquipoRepository 
 from src.utils.enums import EstadoEquipo
-from src.services.vision_service import VisionService
 from src.services.predictive_service import PredictiveService
+from src.services.sync_service import SyncService
+from src.services.snapshot_service import SnapshotFlota
+from src.services.write_behind_service import WriteBehindService
+from src.services.report_service import ReportService, generar_pdf
+from src.utils import metricas
+from src.utils.metricas import medir, tramo
 
-# --- NUEVOS IMPORTS PARA LA FACTORY Y EL MAPPER ---
-from src.utils.mapper import map_json_to_object
+# --- NUEVOS IMPORTS PARA LA FACTORY ---
 from src.equipo_factory import EquipoFactory
 
 # ==============================================================================
 # 0. CLASE PARA EQUIPOS GENÉRICOS
 # ==============================================================================
 class EquipoGenerico(Equipo):
+    __slots__ = ("descripcion", "detalles_tecnicos")
+
     def __init__(self, id_activo, modelo, fecha_compra, descripcion, estrategia_desgaste):
         super().__init__(id_activo, modelo, fecha_compra, estrategia_desgaste)
         self.descripcion = descripcion
@@ -32,6 +44,9 @@ class EquipoGenerico(Equipo):
 # 1. UTILIDADES
 # ==============================================================================
 
+# Límites de desgaste entre un diagnóstico y el siguiente (ver obtener_comentario_estado)
+UMBRALES_DIAGNOSTICO = (0.2, 0.5, 0.8)
+
 def obtener_comentario_estado(obs_val, estado_str):
     est_upper = str(estado_str).upper()
     if any(palabra in est_upper for palabra in ["MANTENIMIENTO", "FALLA", "REPORTADO", "BAJA"]):
@@ -41,74 +56,85 @@ def obtener_comentario_estado(obs_val, estado_str):
     elif obs_val < 0.8: return "🟠 Desgaste avanzado."
     else: return "🔴 CRÍTICO: Riesgo inminente."
 
-def convertir_objetos_a_df(_lista_equipos_dict, _trigger): 
-    data = []
+@medir("vista.convertir_objetos_a_df")
+def convertir_objetos_a_df(_lista_equipos_dict, _trigger=None):
+    """Tabla de inventario armada columna por columna (sin un dict por fila)."""
     if not _lista_equipos_dict or not isinstance(_lista_equipos_dict, dict): 
         return pd.DataFrame()
 
-    for lab_nombre, lista_equipos in _lista_equipos_dict.items():
-        if not isinstance(lista_equipos, list): continue 
-        for eq in lista_equipos:
-            obs_num = eq.calcular_obsolescencia()
-            estado_actual = eq.estado.name if hasattr(eq.estado, 'name') else str(eq.estado)
-            data.append({
-                "ID": eq.id_activo,
-                "Modelo": eq.modelo,
-                "Tipo": type(eq).__name__, 
-                "Ubicación": lab_nombre,
-                "Estado": estado_actual,
-                "Desgaste (%)": f"{obs_num * 100:.2f}%", 
-                "Diagnóstico": obtener_comentario_estado(obs_num, estado_actual),
-                "OBJ_REF": eq 
-            })
-    return pd.DataFrame(data)
-
-# --- Función PDF Profesional ---
-def generar_pdf(equipo, lab):
-    pdf = FPDF()
-    pdf.add_page()
-    
-    # TÍTULO
-    pdf.set_font('Arial', 'B', 16)
-    pdf.cell(0, 10, f'FICHA TECNICA: {equipo.modelo}', 0, 1, 'C')
-    pdf.ln(5)
-
-    # INFO GENERAL
-    pdf.set_font('Arial', '', 11)
-    pdf.cell(0, 8, f"ID Activo: {equipo.id_activo}", 0, 1)
-    pdf.cell(0, 8, f"Ubicacion: {lab}", 0, 1)
-    pdf.cell(0, 8, f"Fecha Compra: {equipo.fecha_compra}", 0, 1)
-    pdf.cell(0, 8, f"Estado Actual: {equipo.estado.name}", 0, 1)
-    
-    # RESULTADOS
-    obs = equipo.calcular_obsolescencia()
-    pdf.set_font('Arial', 'B', 11)
-    pdf.cell(0, 8, f"Nivel de Desgaste Calculado: {obs*100:.2f}%", 0, 1)
-    pdf.ln(5)
-    
-    # HISTORIAL
-    pdf.set_font('Arial', 'B', 12)
-    pdf.cell(0, 10, "Historial de Mantenimiento e Incidencias:", 0, 1)
-    pdf.set_font('Arial', '', 10)
-    
-    if equipo.historial_incidencias:
-        for inc in equipo.historial_incidencias:
-            fecha = inc.get('fecha', '-')
-            # Limpieza de caracteres (emojis) para evitar crash
-            texto = inc.get('detalle', '-').encode('latin-1', 'ignore').decode('latin-1')
-            dictamen = inc.get('dictamen_ia', '')
-            
-            pdf.multi_cell(0, 6, f"[{fecha}] {texto}")
-            if dictamen:
-                dic_clean = dictamen.encode('latin-1', 'ignore').decode('latin-1')
-                pdf.set_font('Arial', 'I', 9)
-                pdf.multi_cell(0, 6, f"   >> Dictamen IA: {dic_clean}")
-                pdf.set_font('Arial', '', 10)
-            pdf.ln(2)
-    else:
-        pdf.cell(0, 10, "Sin registros de mantenimiento.", 0, 1)
-
-    return pdf.output(dest='S').encode('latin-1', 'ignore')
+    flota = [(lab_nombre, eq) for lab_nombre, lista_equipos in _lista_equipos_dict.items()
+             if isinstance(lista_equipos, list) for eq in lista_equipos]
+    if not flota:
+        return pd.DataFrame()
+    labs = [lab_nombre for lab_nombre, _ in flota]
+    equipos = [eq for _, eq in flota]
+
+    # Un solo cálculo vectorizado para toda la flota en lugar de uno por activo
+    obsolescencias = calcular_obsolescencia_flota(equipos)
+    # La fecha de falla estimada también sale de un solo cálculo, reutilizando el desgaste
+    fallas = PredictiveService().predecir_flota(equipos, obsolescencias)["fecha_falla"]
+
+    estados = [eq.estado.name if hasattr(eq.estado, 'name') else str(eq.estado) for eq in equipos]
+    # El diagnóstico solo depende del tramo de desgaste y del estado: se calcula una vez por combinación
+    tramos = np.searchsorted(UMBRALES_DIAGNOSTICO, obsolescencias, side='right')
+    representantes = (0.0,) + UMBRALES_DIAGNOSTICO
+    comentarios = {}
+    for clave in zip(tramos.tolist(), estados):
+        if clave not in comentarios:
+            comentarios[clave] = obtener_comentario_estado(representantes[clave[0]], clave[1])
+
+    return pd.DataFrame({
+        "ID": [eq.id_activo for eq in equipos],
+        "Modelo": [eq.modelo for eq in equipos],
+        "Tipo": [type(eq).__name__ for eq in equipos],
+        "Ubicación": labs,
+        "Estado": estados,
+        "Desgaste (%)": [f"{obs_num * 100:.2f}%" for obs_num in obsolescencias.tolist()],
+        "Diagnóstico": [comentarios[clave] for clave in zip(tramos.tolist(), estados)],
+        "Falla Estimada": fallas.dt.date,
+        "OBJ_REF": equipos,
+    })
+
+def _leer_archivo(ruta):
+    with open(ruta, "rb") as archivo:
+        return archivo.read()
+
+# ZIPs de reportes en la carpeta temporal: se borran cuando pasan estas horas
+PREFIJO_ZIP_REPORTES = "Reportes_FIEE_"
+HORAS_ZIP_REPORTES = 2
+
+def barrer_zips_viejos(horas=HORAS_ZIP_REPORTES):
+    """
+    Borra los ZIPs de reportes con más de 'horas' de antigüedad. Cada sesión borra el
+    suyo al generar otro, pero los de sesiones cerradas quedarían para siempre.
+    """
+    limite = time.time() - horas * 3600
+    for ruta in glob.glob(os.path.join(tempfile.gettempdir(), f"{PREFIJO_ZIP_REPORTES}*.zip")):
+        try:
+            if os.path.getmtime(ruta) < limite:
+                os.remove(ruta)
+        except OSError:
+            pass  # Otro proceso lo borró primero
+
+# Al cargar el dashboard (una vez por proceso) se limpia lo que dejó el servidor anterior
+barrer_zips_viejos()
+
+def tabla_flota(registro):
+    """
+    Tabla de toda la flota, guardada en la sesión: solo se vuelve a armar si el
+    registro cambió de versión (o cambió el día, porque el desgaste depende de la fecha).
+    Cada sesión tiene su propia tabla, así un cambio en una no borra la de las demás.
+    """
+    version = getattr(registro, 'version', None)
+    if version is None:
+        return convertir_objetos_a_df(registro)
+    clave = (version, datetime.now().date())
+    cache = st.session_state.get('tabla_flota')
+    if cache is None or cache[0] != clave:
+        cache = (clave, convertir_objetos_a_df(registro))
+        st.session_state.tabla_flota = cache
+    return cache[1]
+
 
 # ==============================================================================
 # 2. VISTA DASHBOARD
@@ -117,9 +143,6 @@ def generar_pdf(equipo, lab):
 class VistaDashboard(Vista):
     
     def _cargar_y_agrupar_desde_supabase(self):
-        repo = EquipoRepository()
-        datos_raw = repo.leer_todos()
-        
         laboratorios_dict = {
             "Laboratorio de Control": [], "Laboratorio de Circuitos": [],
             "Laboratorio de Máquinas": [],
@@ -129,62 +152,104 @@ class VistaDashboard(Vista):
         est_lineal = st.session_state.get('est_lineal', DesgasteLineal())
         est_expo = st.session_state.get('est_expo', DesgasteExponencial())
 
-        if not datos_raw: return laboratorios_dict
-
-        # --- MODIFICACIÓN 1: Usamos el Mapper y agrupamos ---
-        equipos_lista = map_json_to_object(datos_raw, est_lineal, est_expo)
-
-        for equipo in equipos_lista:
-            ubicacion = getattr(equipo, 'ubicacion', 'Laboratorio FIEE')
-            if ubicacion not in laboratorios_dict: 
-                laboratorios_dict[ubicacion] = []
-            laboratorios_dict[ubicacion].append(equipo)
-            
+        # --- Lectura paginada: mapeamos y agrupamos cada página apenas llega (y se renueva el snapshot) ---
+        laboratorios_dict, st.session_state.estado_sync = SyncService(snapshot=SnapshotFlota()).carga_completa(
+            est_lineal, est_expo, laboratorios_dict
+        )
         return laboratorios_dict
 
+    def _sincronizar_cambios(self):
+        """
+        Trae solo lo que cambió desde la última carga y lo parcha en db_laboratorios.
+        Si el servicio detecta un hueco, se hace la carga completa.
+        """
+        nuevo_estado = SyncService().sincronizar(
+            st.session_state.db_laboratorios, st.session_state.get('estado_sync'),
+            st.session_state.est_lineal, st.session_state.est_expo
+        )
+        if nuevo_estado is None:
+            st.session_state.db_laboratorios = self._cargar_y_agrupar_desde_supabase()
+        else:
+            st.session_state.estado_sync = nuevo_estado
+
     def render(self):
         st.title("📊 Dashboard de Activos FIEE")
         st.markdown("---")
+        self.avisar_cambios_sin_guardar()
 
         if 'trigger' not in st.session_state: st.session_state.trigger = 0
         if 'est_lineal' not in st.session_state: st.session_state.est_lineal = DesgasteLineal()
         if 'est_expo' not in st.session_state: st.session_state.est_expo = DesgasteExponencial()
 
-        es_lista_erronea = ('db_laboratorios' in st.session_state and not isinstance(st.session_state.db_laboratorios, dict))
+        es_lista_erronea = ('db_laboratorios' in st.session_state and not isinstance(st.session_state.db_laboratorios, RegistroFlota))
         
-        if 'db_laboratorios' not in st.session_state or st.session_state.trigger > 0 or es_lista_erronea:
+        if 'db_laboratorios' not in st.session_state or es_lista_erronea:
             st.session_state.db_laboratorios = self._cargar_y_agrupar_desde_supabase()
             st.session_state.trigger = 0 
+        elif st.session_state.trigger > 0:
+            self._sincronizar_cambios()
+            st.session_state.trigger = 0
+        self.avisar_carga_incompleta()
 
-        tab_tabla, tab_detalle, tab_recup, tab_alta = st.tabs([
-            "📋 Inventario", "⚙️ Gestión Técnica", "🚑 Recuperación", "➕ Actualizar Inventario"
+        tab_tabla, tab_detalle, tab_recup, tab_alta, tab_rendimiento = st.tabs([
+            "📋 Inventario", "⚙️ Gestión Técnica", "🚑 Recuperación", "➕ Actualizar Inventario", "📈 Rendimiento"
         ])
 
         # 1. TABLA GENERAL
-        with tab_tabla:
+        with tab_tabla, tramo("vista.tab_inventario"):
             labs_con_datos = [k for k, v in st.session_state.db_laboratorios.items() if len(v) > 0]
             
             if labs_con_datos:
                 opciones = ["🔍 VER TODOS"] + labs_con_datos
                 filtro_lab = st.selectbox("Filtrar por Ubicación:", opciones)
                 
-                df = convertir_objetos_a_df(st.session_state.db_laboratorios, st.session_state.trigger)
+                # La tabla de la flota se arma solo cuando el registro cambió; el filtro es una máscara
+                df = tabla_flota(st.session_state.db_laboratorios)
+                if filtro_lab != "🔍 VER TODOS" and not df.empty:
+                    df = df[df["Ubicación"] == filtro_lab]
                 
                 if not df.empty:
-                    df_show = df.drop(columns=["OBJ_REF"])
-                    
-                    if filtro_lab != "🔍 VER TODOS":
-                        df_show = df_show[df_show["Ubicación"] == filtro_lab]
+                    # Filtro por fecha de falla estimada (la tabla sale ordenada por urgencia)
+                    horizonte = st.selectbox("Falla estimada:", ["Todas", "Próximos 30 días", "Próximos 90 días", "Próximo año"])
+                    dias_horizonte = {"Próximos 30 días": 30, "Próximos 90 días": 90, "Próximo año": 365}.get(horizonte)
+                    if dias_horizonte:
+                        limite = (pd.Timestamp.now() + pd.Timedelta(days=dias_horizonte)).date()
+                        df = df[df["Falla Estimada"] <= limite]
+                    df_show = df.sort_values("Falla Estimada", kind="stable").drop(columns=["OBJ_REF"])
                     
                     st.dataframe(df_show, use_container_width=True, hide_index=True)
                     st.caption(f"Mostrando {len(df_show)} registros.")
+
+                    # Reportes de auditoría: fichas de la ubicación filtrada (o de todas) en un ZIP
+                    with st.expander("📦 Reportes PDF masivos"):
+                        por_lab = st.radio("Formato:", ["Un PDF por equipo", "Un PDF por laboratorio"],
+                                           horizontal=True) == "Un PDF por laboratorio"
+                        if st.button("Generar ZIP de reportes"):
+                            labs = None if filtro_lab == "🔍 VER TODOS" else [filtro_lab]
+                            anterior = st.session_state.pop('zip_reportes', None)
+                            if anterior and os.path.exists(anterior[0]):
+                                os.remove(anterior[0])
+                            barrer_zips_viejos()
+                            # El ZIP se escribe en disco a medida que llega cada PDF: en memoria no queda ninguno
+                            descriptor, ruta_zip = tempfile.mkstemp(prefix=PREFIJO_ZIP_REPORTES, suffix=".zip")
+                            with os.fdopen(descriptor, "wb") as destino, st.spinner("Generando fichas técnicas..."):
+                                documentos = ReportService().generar_zip(
+                                    st.session_state.db_laboratorios, destino, labs, por_laboratorio=por_lab
+                                )
+                            st.session_state.zip_reportes = (ruta_zip, documentos)
+
+                        zip_listo = st.session_state.get('zip_reportes')
+                        if zip_listo and os.path.exists(zip_listo[0]):
+                            # Descarga diferida: el archivo se lee recién cuando alguien hace clic
+                            st.download_button(f"⬇️ Descargar ZIP ({zip_listo[1]} PDFs)", partial(_leer_archivo, zip_listo[0]),
+                                               file_name="Reportes_FIEE.zip", mime="application/zip")
                 else:
                     st.info("No hay equipos registrados.")
             else:
                 st.warning("No hay datos cargados (Inventario Vacío). Ve a la pestaña 'Alta Inventario' para comenzar.")
 
         # 2. GESTIÓN TÉCNICA
-        with tab_detalle:
+        with tab_detalle, tramo("vista.tab_gestion"):
             labs_con_datos = [k for k, v in st.session_state.db_laboratorios.items() if len(v) > 0]
             
             if labs_con_datos:
@@ -202,15 +267,17 @@ class VistaDashboard(Vista):
                     st.markdown("#### 🤖 Inspección Visual")
                     img = st.file_uploader("Subir foto daño:", type=['jpg','png'], key=f"ia_{eq_sel.id_activo}")
                     if img and st.button("Analizar", key=f"btn_ia_{eq_sel.id_activo}"):
+                        # OpenCV se carga recién con la primera foto analizada
+                        from src.services.vision_service import VisionService
                         vision = VisionService()
                         res = vision.analizar_quemadura(img)
-                        eq_sel.historial_incidencias.append({
-                            "fecha": datetime.now().strftime("%Y-%m-%d"),
-                            "detalle": f"IA: {res['alerta']}", "dictamen_ia": res['diagnostico']
-                        })
+                        ticket = eq_sel.registrar_incidencia(f"IA: {res['alerta']}", dictamen_ia=res['diagnostico'],
+                                                             fecha=datetime.now().strftime("%Y-%m-%d"))
                         if res.get('es_critico'): eq_sel.estado = EstadoEquipo.FALLA
-                        EquipoRepository().actualizar_equipo(eq_sel)
-                        st.session_state.trigger = 1
+                        # El modelo en memoria ya está al día; se guarda en segundo plano
+                        cola = WriteBehindService.instancia()
+                        cola.encolar_incidencia(eq_sel.id_activo, ticket)
+                        cola.encolar(eq_sel)
                         st.rerun()
 
                     st.markdown("---")
@@ -224,10 +291,8 @@ class VistaDashboard(Vista):
                     if st.button("🔄 Actualizar Cálculo", key=f"btn_calc_{eq_sel.id_activo}"):
                         nueva_est = st.session_state.est_lineal if modo_sel == "Lineal" else st.session_state.est_expo
                         eq_sel.cambiar_estrategia(nueva_est)
-                        EquipoRepository().actualizar_equipo(eq_sel)
-                        st.session_state.trigger = 1
-                        st.success(f"Cambiado a modelo {modo_sel}")
-                        time.sleep(1)
+                        WriteBehindService.instancia().encolar(eq_sel)
+                        st.toast(f"Cambiado a modelo {modo_sel}")
                         st.rerun()
 
                 with c2:
@@ -240,13 +305,14 @@ class VistaDashboard(Vista):
                     
                     try:
                         predictor = PredictiveService()
-                        fecha_estimada, grafico_fig = predictor.generar_prediccion(eq_sel)
+                        # El gráfico llega ya renderizado (PNG) y cacheado mientras el equipo no cambie
+                        fecha_estimada, grafico_png = predictor.generar_prediccion_png(eq_sel)
                         
                         st.warning(f"⚠️ Fecha estimada de fallo crítico: **{fecha_estimada}**")
-                        st.pyplot(grafico_fig) # Se muestra el gráfico predictivo
+                        st.image(grafico_png) # Se muestra el gráfico predictivo
                     except Exception as e:
                         st.error(f"No se pudo generar la predicción: {e}")
-                        st.info("Asegúrate de haber instalado scikit-learn y matplotlib en tu entorno.")
+                        st.info("Asegúrate de haber instalado matplotlib en tu entorno.")
                     # ----------------------------------------
                     
                     st.markdown("---")
@@ -263,13 +329,10 @@ class VistaDashboard(Vista):
                 st.info("No hay equipos para gestionar.")
 
         # 3. ZONA DE RECUPERACIÓN
-        with tab_recup:
+        with tab_recup, tramo("vista.tab_recuperacion"):
             st.subheader("🛠️ Mantenimiento Correctivo")
-            observados = []
-            if isinstance(st.session_state.db_laboratorios, dict):
-                for lab_n, lista in st.session_state.db_laboratorios.items():
-                    for e in lista:
-                        if e.estado.name != "OPERATIVO": observados.append((lab_n, e))
+            # Índice por estado del registro: no hace falta recorrer toda la flota
+            observados = st.session_state.db_laboratorios.no_operativos()
             
             if not observados:
                 st.success("✅ Todo el inventario está operativo.")
@@ -283,15 +346,14 @@ class VistaDashboard(Vista):
                     informe = st.text_area("Detalle Técnico de la Reparación:")
                     if st.form_submit_button("✅ Dar de Alta (Reingreso)"):
                         eq_rep.estado = EstadoEquipo.OPERATIVO
-                        eq_rep.historial_incidencias.append({
-                            "fecha": datetime.now().strftime("%Y-%m-%d"), "detalle": f"REPARACIÓN: {informe}"
-                        })
-                        EquipoRepository().actualizar_equipo(eq_rep)
-                        st.session_state.trigger = 1
+                        ticket = eq_rep.registrar_incidencia(f"REPARACIÓN: {informe}", fecha=datetime.now().strftime("%Y-%m-%d"))
+                        cola = WriteBehindService.instancia()
+                        cola.encolar_incidencia(eq_rep.id_activo, ticket)
+                        cola.encolar(eq_rep)
                         st.rerun()
 
         # 4. ALTA INVENTARIO
-        with tab_alta:
+        with tab_alta, tramo("vista.tab_alta"):
             st.subheader("➕ Nuevo Ingreso")
             LABS_POSIBLES = ["Laboratorio de Control", "Laboratorio de Circuitos", "Laboratorio de Máquinas", "Laboratorio FIEE"]
             
@@ -361,4 +423,41 @@ class VistaDashboard(Vista):
                     new.ubicacion = lab_dest
                     EquipoRepository().guardar_equipo(new)
                     st.session_state.trigger = 1
-                    st.rerun()
\ No newline at end of file
+                    st.rerun()
+
+        # 5. RENDIMIENTO (métricas de las operaciones instrumentadas)
+        with tab_rendimiento:
+            self._panel_rendimiento()
+
+    def _panel_rendimiento(self):
+        st.subheader("📈 Tiempos de las rutas calientes")
+        st.caption("Métricas de este proceso del servidor (todas las sesiones). Desactivadas no cuestan nada.")
+
+        c_activo, c_umbral, c_reiniciar = st.columns(3)
+        encendido = c_activo.checkbox("Medir operaciones", value=metricas.activo())
+        if encendido != metricas.activo():
+            metricas.activar(encendido)
+        metricas.METRICAS.umbral_lento_ms = c_umbral.number_input(
+            "Umbral de operación lenta (ms)", min_value=1.0, value=float(metricas.METRICAS.umbral_lento_ms), step=50.0
+        )
+        if c_reiniciar.button("🧹 Reiniciar métricas"):
+            metricas.METRICAS.reiniciar()
+
+        filas = metricas.METRICAS.instantanea()
+        if not filas:
+            st.info("Todavía no hay mediciones. Active 'Medir operaciones' y use la aplicación.")
+            return
+        st.dataframe(pd.DataFrame(filas), use_container_width=True, hide_index=True)
+
+        lentas = metricas.METRICAS.lentas()
+        with st.expander(f"🐢 Operaciones lentas ({len(lentas)})"):
+            if lentas:
+                st.dataframe(pd.DataFrame(lentas), use_container_width=True, hide_index=True)
+            else:
+                st.write("Ninguna superó el umbral.")
+
+        texto = metricas.METRICAS.a_prometheus()
+        with st.expander("Formato Prometheus"):
+            st.code(texto, language="text")
+        st.download_button("⬇️ Descargar métricas (Prometheus)", texto,
+                           file_name="fiee_metricas.prom", mime="text/plain")
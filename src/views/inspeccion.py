@@ -1,42 +1,31 @@
 import streamlit as st
-import time
-import os
 from src.views.base_view import Vista
 from src.utils.enums import EstadoEquipo
-from src.repositories.equipo_repository import EquipoRepository # <--- NUEVO
-
-try:
-    from src.services.vision_service import VisionService
-except ImportError:
-    VisionService = None
+from src.models.flota import RegistroFlota
+from src.services.write_behind_service import WriteBehindService
+from src.utils.metricas import medir
 
 class VistaInspeccion(Vista):
+    @medir("vista.inspeccion")
     def render(self):
         st.header("📲 Inspección Técnica (Estudiante)")
         st.markdown("---")
+        self.avisar_cambios_sin_guardar()
 
         # --- CARGA AUTÓNOMA DE DATOS ---
         # Si el estudiante entra directo y la BD no está cargada, la descargamos.
-        if 'db_laboratorios' not in st.session_state or not isinstance(st.session_state.db_laboratorios, dict):
+        if 'db_laboratorios' not in st.session_state or not isinstance(st.session_state.db_laboratorios, RegistroFlota):
             from src.views.dashboard import VistaDashboard
             st.session_state.db_laboratorios = VistaDashboard()._cargar_y_agrupar_desde_supabase()
             st.session_state.trigger = 0
+        self.avisar_carga_incompleta()
         # -------------------------------
 
         # 1. SIMULACIÓN DE ESCANEO QR
         qr_input = st.text_input("🔫 Escanear Código QR (ID del Activo):", placeholder="Ej: MOT-01").strip()
 
-        equipo_encontrado = None
-        lab_ubicacion = None
-
-        # Buscamos el equipo
-        if qr_input and isinstance(st.session_state.db_laboratorios, dict):
-            for lab, lista_equipos in st.session_state.db_laboratorios.items():
-                for eq in lista_equipos:
-                    if eq.id_activo == qr_input:
-                        equipo_encontrado = eq
-                        lab_ubicacion = lab
-                        break
+        # Buscamos el equipo en el índice del registro (O(1), sin recorrer los laboratorios)
+        lab_ubicacion, equipo_encontrado = st.session_state.db_laboratorios.buscar(qr_input)
         
         # 2. SI ENCUENTRA EL EQUIPO -> MUESTRA FICHA TÉCNICA
         if equipo_encontrado:
@@ -82,24 +71,23 @@ class VistaInspeccion(Vista):
                         # --- BLOQUE VISIÓN ---
                         if foto_final:
                             with st.spinner("Procesando evidencia..."):
-                                time.sleep(1.5)
-                                temp_filename = "temp_vision.jpg"
-                                with open(temp_filename, "wb") as f: f.write(foto_final.getbuffer())
-                                
+                                # La foto se analiza directo desde memoria (sin archivo temporal)
                                 try:
+                                    # OpenCV se carga recién con la primera foto, no al abrir la vista
+                                    try:
+                                        from src.services.vision_service import VisionService
+                                    except ImportError:
+                                        VisionService = None
+
                                     if VisionService:
-                                        servicio = VisionService()
-                                        if hasattr(servicio, 'analizar_quemadura'):
-                                            resultado = servicio.analizar_quemadura(temp_filename)
-                                        elif hasattr(servicio, 'analizar_imagen'):
-                                            resultado = servicio.analizar_imagen(temp_filename)
-                                        else:
-                                            resultado = {"diagnostico": "Error de Método", "alerta": False}
-                                        
+                                        # Un solo análisis: quemadura + calidad de la foto
+                                        resultado = VisionService().inspeccionar(foto_final)
                                         dictamen_ia = f"IA: {resultado.get('diagnostico', 'Desconocido')}"
-                                        
+                                        if resultado["advertencias"]:
+                                            dictamen_ia += " | Foto: " + "; ".join(resultado["advertencias"])
+
                                         # La IA decide si cambia el estado o no
-                                        if resultado.get('alerta') or "QUEMADURA" in str(resultado):
+                                        if resultado["es_critico"]:
                                             equipo_encontrado.estado = EstadoEquipo.EN_MANTENIMIENTO
                                             
                                     else:
@@ -107,26 +95,21 @@ class VistaInspeccion(Vista):
                                 
                                 except Exception as e:
                                     dictamen_ia = f"Error en IA: {str(e)}"
-                                finally:
-                                    if os.path.exists(temp_filename): os.remove(temp_filename)
 
                         # --- GUARDADO EN HISTORIAL (Siempre se guarda) ---
                         detalle_log = f"Reportado por {usuario}: {descripcion}"
-                        equipo_encontrado.registrar_incidencia(detalle_log)
-                        ultimo_ticket = equipo_encontrado.historial_incidencias[-1]
-                        ultimo_ticket['dictamen_ia'] = dictamen_ia
+                        # El ticket se registra completo (con el dictamen) para que la bandera crítica se calcule bien
+                        ticket = equipo_encontrado.registrar_incidencia(detalle_log, dictamen_ia=dictamen_ia)
 
-                        # --- PERSISTENCIA SUPABASE ---
-                        repo = EquipoRepository()
-                        repo.actualizar_equipo(equipo_encontrado)
+                        # --- PERSISTENCIA SUPABASE (en segundo plano) ---
+                        # El ticket se agrega a la tabla de incidencias; la fila del equipo solo lleva el estado
+                        cola = WriteBehindService.instancia()
+                        cola.encolar_incidencia(equipo_encontrado.id_activo, ticket)
+                        cola.encolar(equipo_encontrado)
 
-                        st.success("✅ Reporte registrado y guardado en la Nube.")
-                        
-                        # --- LIMPIEZA DE MEMORIA PARA ACTUALIZAR EL DASHBOARD ---
-                        st.session_state.trigger = st.session_state.get('trigger', 0) + 1
-                        st.cache_data.clear()
-                        if 'db_laboratorios' in st.session_state:
-                            del st.session_state['db_laboratorios']
+                        st.success("✅ Reporte registrado. Se está guardando en la Nube (si falla, se avisa arriba).")
+                        # No hace falta limpiar cachés: el registro cambió de versión con el reporte
+                        # y la tabla del dashboard de esta sesión se rearma sola
                         
         elif qr_input:
             st.error("❌ Código QR no encontrado en la base de datos.")
\ No newline at end of file
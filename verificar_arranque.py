@@ -0,0 +1,87 @@
+import os
+import re
+import subprocess
+import sys
+from statistics import median
+
+# Lo que importa app.py antes de mostrar la vista del estudiante (escaneo de QR)
+RUTA_ESTUDIANTE = [
+    "src.models.concretos",
+    "src.logical.estrategias",
+    "src.services.sync_service",
+    "src.services.snapshot_service",
+    "src.views.inspeccion",
+]
+
+# Dependencias que solo se deben cargar al usarlas (dashboard, fotos, PDF, gráficos, Supabase)
+PESADOS = ["pandas", "matplotlib", "cv2", "fpdf", "sklearn", "supabase", "httpx", "PIL", "pyarrow"]
+
+# Presupuesto de arranque en milisegundos (sin contar Streamlit, que siempre se carga)
+PRESUPUESTO_MS = float(os.getenv("FIEE_PRESUPUESTO_ARRANQUE_MS", "200"))
+REPETICIONES = 3
+
+_LINEA = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def medir_importacion(modulos):
+    """
+    Importa los módulos en un proceso limpio con `python -X importtime`.
+    Streamlit se importa antes, así su costo (y lo que carga por su cuenta) no se mezcla.
+    Devuelve ({modulo_pedido: microsegundos acumulados}, {todo lo que cargó cada uno}).
+    """
+    codigo = "; ".join(f"import {m}" for m in ["streamlit"] + modulos)
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"No se pudo importar la ruta de arranque:\n{proceso.stderr[-2000:]}")
+
+    # Los hijos se listan antes que su padre: cada módulo de primer nivel cierra su grupo
+    tiempos, cargados, grupo = {}, set(), []
+    for linea in proceso.stderr.splitlines():
+        coincidencia = _LINEA.match(linea)
+        if not coincidencia:
+            continue
+        grupo.append(coincidencia.group(4))
+        if coincidencia.group(3) == "":
+            if coincidencia.group(4) in modulos:
+                tiempos[coincidencia.group(4)] = int(coincidencia.group(2))
+                cargados.update(grupo)
+            grupo = []
+    return tiempos, cargados
+
+
+def verificar_arranque():
+    print("=== VERIFICACIÓN DE ARRANQUE (ruta del estudiante) ===\n")
+
+    mediciones = [medir_importacion(RUTA_ESTUDIANTE) for _ in range(REPETICIONES)]
+    tiempos, cargados = mediciones[-1]
+
+    # 1. Dependencias pesadas que no deberían cargarse al abrir la app
+    colados = sorted(m for m in PESADOS if any(t == m or t.startswith(m + ".") for t in cargados))
+
+    # 2. Tiempo total sin Streamlit (mediana de varias corridas para bajar el ruido)
+    total_ms = median(sum(t.values()) / 1000 for t, _ in mediciones)
+
+    print(f"{'MÓDULO':<40} | {'ACUMULADO (ms)':>14}")
+    print("-" * 58)
+    for nombre in RUTA_ESTUDIANTE:
+        print(f"{nombre:<40} | {tiempos.get(nombre, 0) / 1000:>14.1f}")
+
+    print(f"\nArranque sin Streamlit: {total_ms:.1f} ms (presupuesto {PRESUPUESTO_MS:.0f} ms)")
+
+    correcto = True
+    if colados:
+        print(f"❌ Se cargan dependencias pesadas al arrancar: {', '.join(colados)}")
+        correcto = False
+    if total_ms > PRESUPUESTO_MS:
+        print("❌ El arranque se pasa del presupuesto.")
+        correcto = False
+    if correcto:
+        print("✅ Arranque dentro del presupuesto y sin dependencias pesadas.")
+    return correcto
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verificar_arranque() else 1)